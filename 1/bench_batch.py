@@ -0,0 +1,35 @@
+import asyncio
+import time
+
+from main import Client
+from stub_server import StubServer
+
+
+def run_benchmark(total: int = 2000, levels=(1, 10, 50, 100, 200)) -> None:
+    server = StubServer(posts_count=total)
+    server.start_in_thread()
+    print(f'Тестовый сервер: {server.base_url}, запросов на уровень: {total}')
+
+    try:
+        with Client(base_url=server.base_url) as client:
+            for concurrency in levels:
+                started = time.perf_counter()
+                results = asyncio.run(client.update_posts(
+                    range(1, total + 1),
+                    concurrency=concurrency,
+                    request_timeout=10
+                ))
+                elapsed = time.perf_counter() - started
+                ok = sum(1 for result in results if result is not None)
+                print(
+                    f'Конкурентность {concurrency:>4}: '
+                    f'{ok / elapsed:8.1f} запросов/с, '
+                    f'успешно {ok}/{total}, {elapsed:.2f} с'
+                )
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == '__main__':
+    run_benchmark()
@@ -1,31 +1,129 @@
+import asyncio
 import json
+import os
+import sys
+import aiohttp
 import requests
-from typing import Dict, Optional
+from requests.adapters import HTTPAdapter
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.http_cache import HttpCache, default_cache  # noqa: E402
+from common.json_stream import iter_json_array  # noqa: E402
 
 
 class Client:
-    def __init__(self) -> None:
-        self.base_url = 'https://jsonplaceholder.typicode.com'
-        self.timeout = 30
+    def __init__(
+        self,
+        base_url: str = 'https://jsonplaceholder.typicode.com',
+        timeout: float = 30,
+        pool_connections: int = 10,
+        pool_maxsize: int = 10,
+        pool_block: bool = False,
+        cache: Optional[HttpCache] = None
+    ) -> None:
+        self.base_url = base_url
+        self.timeout = timeout
+        self.cache = cache
 
-    def get_even_user_posts(self) -> None:
-        try:
-            response = requests.get(
-                f'{self.base_url}/posts',
-                timeout=self.timeout
-            )
-            response.raise_for_status()
-            posts = response.json()
+        # Одна сессия на клиента: соединения переиспользуются (keep-alive),
+        # вместо нового TCP+TLS рукопожатия на каждый запрос
+        self.adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block
+        )
+        self.session = requests.Session()
+        self.session.headers['Connection'] = 'keep-alive'
+        self.session.mount('http://', self.adapter)
+        self.session.mount('https://', self.adapter)
+
+    def __enter__(self) -> 'Client':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.session.close()
+
+    def connection_stats(self) -> Dict[str, int]:
+        """Статистика переиспользования соединений по всем пулам"""
+        requests_count = 0
+        connections_count = 0
+        pools = self.adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            requests_count += pool.num_requests
+            connections_count += pool.num_connections
+
+        return {
+            'requests': requests_count,
+            'connections': connections_count,
+            'reused': max(requests_count - connections_count, 0)
+        }
+
+    def iter_even_user_posts(
+        self,
+        limit: int = 20,
+        page_size: int = 50
+    ) -> Iterator[Dict]:
+        """Постранично (_start/_limit) отдаёт посты с чётными ID до limit штук"""
+        found = 0
+        start = 0
+        last_id = 0
 
-            even_user_posts = [
-                post for post in posts
-                if post['id'] % 2 == 0
-            ][:20]
+        while found < limit:
+            params = {'_start': start, '_limit': page_size}
+            if self.cache is not None:
+                response = self.cache.get(
+                    f'{self.base_url}/posts',
+                    session=self.session,
+                    params=params,
+                    timeout=self.timeout
+                )
+            else:
+                response = self.session.get(
+                    f'{self.base_url}/posts',
+                    params=params,
+                    timeout=self.timeout,
+                    stream=True
+                )
+
+            with response:
+                response.raise_for_status()
+                page_count = 0
+                new_posts = 0
+                for post in iter_json_array(response.iter_content(chunk_size=8192)):
+                    page_count += 1
+                    # Сервер без поддержки пагинации вернёт те же посты повторно
+                    if post['id'] <= last_id:
+                        continue
+                    last_id = post['id']
+                    new_posts += 1
+                    if post['id'] % 2 == 0:
+                        yield post
+                        found += 1
+                        if found >= limit:
+                            return
+
+            # Короткая страница - конец коллекции; длинная - сервер
+            # проигнорировал _limit и уже отдал всю коллекцию потоком
+            if page_count != page_size or not new_posts:
+                return
+            start += page_size
+
+    def get_even_user_posts(self, limit: int = 20) -> None:
+        try:
+            even_user_posts = list(self.iter_even_user_posts(limit))
 
             print('\nПосты пользователей с четными ID:')
             print(json.dumps(even_user_posts, indent=2, ensure_ascii=False))
 
-        except requests.RequestException as error:
+        except (requests.RequestException, ValueError) as error:
             print(f'Ошибка при получении постов: {error}')
 
     def create_post(self) -> Optional[Dict]:
@@ -36,7 +134,7 @@ class Client:
         }
 
         try:
-            response = requests.post(
+            response = self.session.post(
                 f'{self.base_url}/posts',
                 json=post_data,
                 timeout=self.timeout
@@ -62,7 +160,7 @@ class Client:
         }
 
         try:
-            response = requests.put(
+            response = self.session.put(
                 f'{self.base_url}/posts/{post_id}',
                 json=update_data,
                 timeout=self.timeout
@@ -76,16 +174,116 @@ class Client:
         except requests.RequestException as error:
             print(f'Ошибка при обновлении поста: {error}')
 
+    async def _send_batch(
+        self,
+        requests_args: List[Dict[str, Any]],
+        concurrency: int,
+        request_timeout: Optional[float]
+    ) -> List[Optional[Dict]]:
+        """Выполняет запросы конкурентно, результаты в порядке запросов"""
+        semaphore = asyncio.Semaphore(concurrency)
+        timeout = request_timeout if request_timeout is not None else self.timeout
+        connector = aiohttp.TCPConnector(limit=concurrency)
+
+        async with aiohttp.ClientSession(connector=connector) as session:
+            async def send(args: Dict[str, Any]) -> Optional[Dict]:
+                async with semaphore:
+                    try:
+                        async with asyncio.timeout(timeout):
+                            async with session.request(**args) as response:
+                                response.raise_for_status()
+                                return await response.json()
+                    except (aiohttp.ClientError, TimeoutError, ValueError):
+                        # ValueError - ответ 2xx с телом не в JSON: теряем
+                        # только этот результат, а не весь пакет
+                        return None
+
+            results = await asyncio.gather(*(send(args) for args in requests_args))
+
+        errors = results.count(None)
+        if errors:
+            print(f'Ошибок в пакете: {errors} из {len(results)}')
+        return results
+
+    async def fetch_posts(
+        self,
+        post_ids: Iterable[int],
+        concurrency: int = 50,
+        request_timeout: Optional[float] = None
+    ) -> List[Optional[Dict]]:
+        return await self._send_batch(
+            [
+                {'method': 'GET', 'url': f'{self.base_url}/posts/{post_id}'}
+                for post_id in post_ids
+            ],
+            concurrency,
+            request_timeout
+        )
+
+    async def create_posts(
+        self,
+        payloads: Iterable[Dict],
+        concurrency: int = 50,
+        request_timeout: Optional[float] = None
+    ) -> List[Optional[Dict]]:
+        return await self._send_batch(
+            [
+                {'method': 'POST', 'url': f'{self.base_url}/posts', 'json': payload}
+                for payload in payloads
+            ],
+            concurrency,
+            request_timeout
+        )
+
+    async def update_posts(
+        self,
+        post_ids: Iterable[int],
+        concurrency: int = 50,
+        request_timeout: Optional[float] = None
+    ) -> List[Optional[Dict]]:
+        return await self._send_batch(
+            [
+                {
+                    'method': 'PUT',
+                    'url': f'{self.base_url}/posts/{post_id}',
+                    'json': {
+                        'id': post_id,
+                        'title': 'Обновлённый пост',
+                        'body': 'Обновленное содержание поста',
+                        'userId': 1
+                    }
+                }
+                for post_id in post_ids
+            ],
+            concurrency,
+            request_timeout
+        )
+
 
 def main() -> None:
-    client = Client()
+    cache = default_cache()
+    with Client(cache=cache) as client:
+        client.get_even_user_posts()
+
+        created_post = client.create_post()
 
-    client.get_even_user_posts()
+        if created_post:
+            client.update_post(40)
 
-    created_post = client.create_post()
+        stats = client.connection_stats()
+        print(
+            f"\nЗапросов: {stats['requests']}, "
+            f"новых соединений: {stats['connections']}, "
+            f"переиспользовано: {stats['reused']}"
+        )
 
-    if created_post:
-        client.update_post(40)
+    cache_stats = cache.stats()
+    print(
+        f"Кэш: попаданий {cache_stats['hits']}, "
+        f"промахов {cache_stats['misses']}, "
+        f"сэкономлено байт {cache_stats['bytes_saved']}"
+    )
+    cache.close()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,121 @@
+import hashlib
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+from urllib.parse import parse_qs, urlsplit
+
+
+def make_posts(count: int) -> List[Dict]:
+    return [
+        {
+            'userId': (post_id - 1) // 10 + 1,
+            'id': post_id,
+            'title': f'Пост {post_id}',
+            'body': f'Содержание поста {post_id}'
+        }
+        for post_id in range(1, count + 1)
+    ]
+
+
+class PostsHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1, чтобы клиенты могли держать keep-alive соединения
+    protocol_version = 'HTTP/1.1'
+    # Заголовки и тело уходят разными send(), без этого Nagle добавляет ~40 мс
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+    def send_json(self, data, status: int = 200) -> None:
+        body = json.dumps(data, ensure_ascii=False).encode()
+        etag = f'W/"{hashlib.sha1(body).hexdigest()}"'
+        if status == 200 and self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_json(self) -> Dict:
+        length = int(self.headers.get('Content-Length', 0))
+        return json.loads(self.rfile.read(length) or b'{}')
+
+    def do_GET(self) -> None:
+        url = urlsplit(self.path)
+        parts = url.path.strip('/').split('/')
+        if parts == ['posts']:
+            # Пагинация в стиле jsonplaceholder: ?_start=N&_limit=M
+            query = parse_qs(url.query)
+            start = int(query.get('_start', ['0'])[0])
+            limit = query.get('_limit')
+            end = start + int(limit[0]) if limit else None
+            self.send_json(self.server.posts[start:end])
+        elif len(parts) == 2 and parts[0] == 'posts' and parts[1].isdigit():
+            post_id = int(parts[1])
+            if 1 <= post_id <= len(self.server.posts):
+                self.send_json(self.server.posts[post_id - 1])
+            else:
+                self.send_json({}, 404)
+        else:
+            self.send_json({}, 404)
+
+    def do_POST(self) -> None:
+        if self.path.rstrip('/') != '/posts':
+            self.send_json({}, 404)
+            return
+        post = self.read_json()
+        post['id'] = len(self.server.posts) + 1
+        self.send_json(post, 201)
+
+    def do_PUT(self) -> None:
+        parts = urlsplit(self.path).path.strip('/').split('/')
+        if len(parts) != 2 or parts[0] != 'posts' or not parts[1].isdigit():
+            self.send_json({}, 404)
+            return
+        post = self.read_json()
+        post['id'] = int(parts[1])
+        self.send_json(post)
+
+
+class StubServer(ThreadingHTTPServer):
+    """Локальная замена jsonplaceholder для тестов и замеров"""
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0,
+                 posts_count: int = 100) -> None:
+        super().__init__((host, port), PostsHandler)
+        self.posts = make_posts(posts_count)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start_in_thread(self) -> threading.Thread:
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+
+def main() -> None:
+    server = StubServer(port=8000)
+    print(f'Тестовый сервер слушает на {server.base_url}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
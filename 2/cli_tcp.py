@@ -1,28 +1,103 @@
-import socket
+import argparse
+import os
+import threading
+import time
 
+from filetransfer import ERROR_SIZE, recv_into_buffer, recv_into_file, recv_size
+from framing import FrameReader, connect, recv_frame, send_frame
 
-def start_tcp_client():
-    client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
 
-    host = '127.0.0.1'
-    port = 12345
+def start_tcp_client(host='127.0.0.1', port=12345, count=1, size=0):
+    client_socket = None
 
     try:
-        client_socket.connect((host, port))
+        client_socket = connect(host, port)
         print(f"[*] Подключено к серверу {host}:{port}")
 
-        message = "Привет, TCP Сервер!"
-        client_socket.send(message.encode())
-        print(f"[*] Отправлено: {message}")
+        if size:
+            payloads = [os.urandom(size) for _ in range(count)]
+        else:
+            payloads = ["Привет, TCP Сервер!".encode()] * count
 
-        response = client_socket.recv(1024).decode()
-        print(f"[*] Получено: {response}")
+        # Конвейер: отправляем все сообщения, не дожидаясь ответов.
+        # Отправка идёт в отдельном потоке, иначе при больших объёмах
+        # клиент и сервер упрутся в заполненные буферы друг друга
+        def send_all():
+            for payload in payloads:
+                send_frame(client_socket, payload)
+            print(f"[*] Отправлено сообщений: {count}")
+
+        sender = threading.Thread(target=send_all, daemon=True)
+        sender.start()
+
+        reader = FrameReader()
+        for payload in payloads:
+            response = recv_frame(client_socket, reader)
+            if response is None:
+                raise ConnectionError("Сервер закрыл соединение")
+            if response != payload:
+                raise ValueError("Ответ не совпадает с отправленным")
+            if not size:
+                print(f"[*] Получено: {bytes(response).decode()}")
+        sender.join()
+        print(f"[*] Получено ответов: {count}")
+
+    except Exception as e:
+        print(f"[!] Ошибка клиента: {e}")
+    finally:
+        if client_socket:
+            client_socket.close()
+
+
+def download_file(host='127.0.0.1', port=12345, name='', output=None):
+    client_socket = None
+
+    try:
+        client_socket = connect(host, port)
+        print(f"[*] Подключено к серверу {host}:{port}")
+
+        send_frame(client_socket, name.encode())
+        size = recv_size(client_socket)
+        if size == ERROR_SIZE:
+            error = recv_frame(client_socket, FrameReader())
+            raise FileNotFoundError(bytes(error).decode())
+
+        started = time.perf_counter()
+        if output:
+            with open(output, "wb") as file:
+                recv_into_file(client_socket, size, file)
+        else:
+            # Без файла назначения принимаем в один заранее выделенный буфер
+            recv_into_buffer(client_socket, size)
+        elapsed = time.perf_counter() - started
+
+        print(f"[*] Получено {size} байт за {elapsed:.2f} с "
+              f"({size / elapsed / 1e6 if elapsed else 0:.1f} МБ/с)")
 
     except Exception as e:
         print(f"[!] Ошибка клиента: {e}")
     finally:
-        client_socket.close()
+        if client_socket:
+            client_socket.close()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="TCP клиент")
+    parser.add_argument("--host", default='127.0.0.1')
+    parser.add_argument("--port", type=int, default=12345)
+    parser.add_argument("--count", type=int, default=1,
+                        help="сколько сообщений отправить конвейером")
+    parser.add_argument("--size", type=int, default=0,
+                        help="размер случайной нагрузки в байтах")
+    parser.add_argument("--get", metavar="NAME",
+                        help="скачать файл с сервера в режиме files")
+    parser.add_argument("--output", help="куда сохранить скачанный файл")
+    return parser.parse_args()
 
 
 if __name__ == "__main__":
-    start_tcp_client()
+    args = parse_args()
+    if args.get:
+        download_file(args.host, args.port, args.get, args.output)
+    else:
+        start_tcp_client(args.host, args.port, args.count, args.size)
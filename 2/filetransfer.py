@@ -0,0 +1,65 @@
+import os
+import struct
+
+# Ответ на запрос файла: 8 байт размера, затем содержимое без кадрирования
+SIZE_HEADER = struct.Struct("!Q")
+# Размер, означающий ошибку; за ним следует обычный кадр с текстом ошибки
+ERROR_SIZE = 2 ** 64 - 1
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def resolve_path(root, name):
+    """Путь к файлу внутри root; выход за пределы каталога запрещён"""
+    root = os.path.realpath(root)
+    path = os.path.realpath(os.path.join(root, name))
+    if os.path.commonpath([root, path]) != root or not os.path.isfile(path):
+        raise FileNotFoundError(name)
+    return path
+
+
+def send_file(sock, path):
+    """Отправляет файл через sendfile: данные идут из page cache в сокет"""
+    with open(path, "rb") as file:
+        size = os.fstat(file.fileno()).st_size
+        sock.sendall(SIZE_HEADER.pack(size))
+        # Отправляем ровно объявленный размер, даже если файл дописывают
+        sent = sock.sendfile(file, 0, size)
+    if sent != size:
+        raise ConnectionError(f"Файл укоротился во время отправки: {path}")
+    return sent
+
+
+def recv_exact(sock, view):
+    received = 0
+    while received < len(view):
+        count = sock.recv_into(view[received:])
+        if not count:
+            raise ConnectionError("Соединение закрыто во время передачи")
+        received += count
+
+
+def recv_size(sock):
+    header = bytearray(SIZE_HEADER.size)
+    recv_exact(sock, memoryview(header))
+    return SIZE_HEADER.unpack(header)[0]
+
+
+def recv_into_buffer(sock, size):
+    """Принимает файл целиком в заранее выделенный буфер"""
+    buffer = bytearray(size)
+    recv_exact(sock, memoryview(buffer))
+    return buffer
+
+
+def recv_into_file(sock, size, file, chunk_size=CHUNK_SIZE):
+    """Принимает файл кусками через один переиспользуемый буфер"""
+    buffer = bytearray(min(chunk_size, max(size, 1)))
+    view = memoryview(buffer)
+    remaining = size
+    while remaining:
+        count = sock.recv_into(view[:min(remaining, len(buffer))])
+        if not count:
+            raise ConnectionError("Соединение закрыто во время передачи")
+        file.write(view[:count])
+        remaining -= count
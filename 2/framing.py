@@ -0,0 +1,111 @@
+import socket
+import struct
+
+# Кадр: 4 байта длины (big-endian) + полезная нагрузка
+HEADER = struct.Struct("!I")
+MAX_FRAME_SIZE = 256 * 1024 * 1024
+
+
+class FrameError(Exception):
+    pass
+
+
+def encode_header(length):
+    if length > MAX_FRAME_SIZE:
+        raise FrameError(f"Слишком большой кадр: {length} байт")
+    return HEADER.pack(length)
+
+
+def send_frame(sock, payload):
+    """Отправляет кадр без склейки заголовка и данных в новый bytes"""
+    header = encode_header(len(payload))
+    if not hasattr(sock, "sendmsg"):
+        # В Windows у сокетов нет sendmsg - отправляем двумя вызовами
+        sock.sendall(header)
+        sock.sendall(payload)
+        return
+    buffers = [memoryview(header), memoryview(payload)]
+    while buffers:
+        sent = sock.sendmsg(buffers)
+        while buffers and sent >= len(buffers[0]):
+            sent -= len(buffers[0])
+            buffers.pop(0)
+        if buffers and sent:
+            buffers[0] = buffers[0][sent:]
+
+
+class FrameReader:
+    """Переиспользуемый буфер приёма, режущий поток на кадры.
+
+    Кадры отдаются как memoryview внутрь буфера (без копирования) и
+    действительны только до следующего вызова read_from().
+    """
+
+    def __init__(self, buffer_size=64 * 1024):
+        self.buffer = bytearray(buffer_size)
+        self.view = memoryview(self.buffer)
+        self.start = 0
+        self.end = 0
+
+    def _reserve(self, needed):
+        pending = self.end - self.start
+        if len(self.buffer) - self.end >= needed:
+            return
+        if len(self.buffer) - pending >= needed:
+            # Сдвигаем недочитанный хвост в начало буфера
+            self.view[:pending] = self.view[self.start:self.end]
+        else:
+            # Кадр не влезает - заводим буфер побольше
+            size = len(self.buffer)
+            while size - pending < needed:
+                size *= 2
+            buffer = bytearray(size)
+            buffer[:pending] = self.view[self.start:self.end]
+            self.buffer = buffer
+            self.view = memoryview(buffer)
+        self.start = 0
+        self.end = pending
+
+    def _wanted(self):
+        # Сколько байт нужно, чтобы дочитать текущий кадр целиком
+        pending = self.end - self.start
+        if pending < HEADER.size:
+            return HEADER.size - pending
+        length, = HEADER.unpack_from(self.buffer, self.start)
+        return max(HEADER.size + length - pending, 1)
+
+    def read_from(self, sock):
+        """Читает из сокета через recv_into; 0 означает закрытие соединения"""
+        self._reserve(max(self._wanted(), 4096))
+        received = sock.recv_into(self.view[self.end:])
+        self.end += received
+        return received
+
+    def frames(self):
+        while self.end - self.start >= HEADER.size:
+            length, = HEADER.unpack_from(self.buffer, self.start)
+            if length > MAX_FRAME_SIZE:
+                raise FrameError(f"Слишком большой кадр: {length} байт")
+            frame_end = self.start + HEADER.size + length
+            if frame_end > self.end:
+                return
+            frame = self.view[self.start + HEADER.size:frame_end]
+            self.start = frame_end
+            yield frame
+        if self.start == self.end:
+            self.start = self.end = 0
+
+
+def recv_frame(sock, reader):
+    """Блокирующее чтение одного кадра; None при закрытии соединения"""
+    while True:
+        for frame in reader.frames():
+            return frame
+        if not reader.read_from(sock):
+            return None
+
+
+def connect(host, port):
+    sock = socket.create_connection((host, port))
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    return sock
@@ -0,0 +1,22 @@
+import hashlib
+
+# Обработчики сообщений: принимают полезную нагрузку кадра, возвращают ответ.
+# Живут в отдельном модуле, чтобы их можно было передать в пул процессов.
+
+
+def echo_handler(payload):
+    return payload
+
+
+def sha256_handler(payload, rounds=10000):
+    """Нагружающий процессор обработчик: многократное хеширование"""
+    digest = bytes(payload)
+    for _ in range(rounds):
+        digest = hashlib.sha256(digest).digest()
+    return digest.hex().encode()
+
+
+HANDLERS = {
+    "echo": echo_handler,
+    "sha256": sha256_handler,
+}
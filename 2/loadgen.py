@@ -0,0 +1,246 @@
+import argparse
+import json
+import platform
+import socket
+import threading
+import time
+
+from framing import FrameReader, connect, recv_frame, send_frame
+
+# Номер запроса - ASCII-цифры, чтобы нагрузка оставалась валидным UTF-8
+# для серверов, которые декодируют сообщения
+SEQUENCE_SIZE = 20
+
+
+class ClientStats:
+    def __init__(self):
+        self.latencies = []
+        self.sent = 0
+        self.received = 0
+        self.errors = 0
+        self.bytes = 0
+
+
+def make_payload(sequence, size):
+    # Номер запроса в начале - по нему сверяем ответ
+    header = b"%020d" % sequence
+    return header + b"x" * max(size - SEQUENCE_SIZE, 0)
+
+
+def reply_sequence(data):
+    # Номер запроса из ответа; None, если ответ короче или испорчен
+    header = bytes(data[:SEQUENCE_SIZE])
+    if len(header) != SEQUENCE_SIZE or not header.isdigit():
+        return None
+    return int(header)
+
+
+def pace(next_send, interval):
+    # Без заданного темпа отправляем сразу, как пришёл предыдущий ответ
+    if not interval:
+        return time.perf_counter()
+    delay = next_send - time.perf_counter()
+    if delay > 0:
+        time.sleep(delay)
+    return next_send
+
+
+def run_tcp_client(args, interval, deadline, stats):
+    try:
+        sock = connect(args.host, args.port)
+    except OSError:
+        stats.errors += 1
+        return
+    sock.settimeout(args.timeout)
+    reader = FrameReader()
+    sequence = 0
+    next_send = time.perf_counter()
+
+    try:
+        while True:
+            next_send = pace(next_send, interval)
+            # Проверяем и реальное время: после таймаутов расписание отстаёт
+            if next_send >= deadline or time.perf_counter() >= deadline:
+                break
+            payload = make_payload(sequence, args.size)
+            try:
+                send_frame(sock, payload)
+                stats.sent += 1
+                response = recv_frame(sock, reader)
+            except OSError:
+                stats.errors += 1
+                break
+            if response is None:
+                stats.errors += 1
+                break
+            # Задержку считаем от запланированного момента отправки,
+            # чтобы медленный сервер не прятал очередь (coordinated omission)
+            stats.latencies.append(time.perf_counter() - next_send)
+            stats.received += 1
+            stats.bytes += len(payload) + len(response)
+            sequence += 1
+            next_send += interval
+    finally:
+        sock.close()
+
+
+def run_udp_client(args, interval, deadline, stats):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.settimeout(args.timeout)
+    buffer = bytearray(max(args.size, SEQUENCE_SIZE) + 1024)
+    sequence = 0
+    next_send = time.perf_counter()
+
+    try:
+        while True:
+            next_send = pace(next_send, interval)
+            # Проверяем и реальное время: после таймаутов расписание отстаёт
+            if next_send >= deadline or time.perf_counter() >= deadline:
+                break
+            payload = make_payload(sequence, args.size)
+            try:
+                sock.sendto(payload, (args.host, args.port))
+                stats.sent += 1
+                while True:
+                    received, _ = sock.recvfrom_into(buffer)
+                    reply = reply_sequence(buffer[:received])
+                    # Опоздавшие ответы на потерянные ранее запросы пропускаем
+                    if reply is None or reply == sequence:
+                        break
+            except socket.timeout:
+                # Считаем пакет потерянным, если ответа нет
+                pass
+            except OSError:
+                stats.errors += 1
+            else:
+                if reply is None:
+                    # Ответ без номера запроса - ошибка, а не потеря
+                    stats.errors += 1
+                else:
+                    stats.latencies.append(time.perf_counter() - next_send)
+                    stats.received += 1
+                    stats.bytes += len(payload) + received
+            sequence += 1
+            next_send += interval
+    finally:
+        sock.close()
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(int(fraction * len(sorted_values)), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def summarize(args, stats_list, elapsed):
+    latencies = sorted(
+        latency for stats in stats_list for latency in stats.latencies)
+    sent = sum(stats.sent for stats in stats_list)
+    received = sum(stats.received for stats in stats_list)
+    errors = sum(stats.errors for stats in stats_list)
+    lost = sent - received - errors if args.protocol == "udp" else 0
+
+    def ms(value):
+        return None if value is None else round(value * 1000, 4)
+
+    return {
+        "label": args.label,
+        "protocol": args.protocol,
+        "host": args.host,
+        "port": args.port,
+        "clients": args.clients,
+        "target_rate": args.rate,
+        "payload_size": args.size,
+        "duration": round(elapsed, 3),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "sent": sent,
+        "received": received,
+        "errors": errors,
+        "lost": lost,
+        "error_rate": errors / sent if sent else 0.0,
+        "loss_rate": lost / sent if sent else 0.0,
+        "throughput_rps": received / elapsed if elapsed else 0.0,
+        "throughput_mbps": sum(stats.bytes for stats in stats_list)
+        * 8 / elapsed / 1e6 if elapsed else 0.0,
+        "latency_ms": {
+            "p50": ms(percentile(latencies, 0.50)),
+            "p95": ms(percentile(latencies, 0.95)),
+            "p99": ms(percentile(latencies, 0.99)),
+            "p999": ms(percentile(latencies, 0.999)),
+            "max": ms(latencies[-1] if latencies else None),
+        },
+    }
+
+
+def run_load(args):
+    # Целевой темп делим поровну между клиентами
+    interval = args.clients / args.rate if args.rate else 0.0
+    runner = run_tcp_client if args.protocol == "tcp" else run_udp_client
+    stats_list = [ClientStats() for _ in range(args.clients)]
+
+    started = time.perf_counter()
+    deadline = started + args.duration
+    threads = [
+        threading.Thread(target=runner,
+                         args=(args, interval, deadline, stats),
+                         daemon=True)
+        for stats in stats_list
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return summarize(args, stats_list, time.perf_counter() - started)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Нагрузочный тест эхо-серверов TCP/UDP")
+    parser.add_argument("--protocol", choices=["tcp", "udp"], default="tcp")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int,
+                        help="по умолчанию 12345 для TCP и 12346 для UDP")
+    parser.add_argument("--clients", type=int, default=10,
+                        help="число одновременных клиентов")
+    parser.add_argument("--rate", type=float, default=0,
+                        help="суммарный темп запросов в секунду "
+                             "(0 - без ограничения)")
+    parser.add_argument("--size", type=int, default=64,
+                        help="размер нагрузки в байтах")
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--timeout", type=float, default=1,
+                        help="таймаут ожидания ответа в секундах")
+    parser.add_argument("--label", default="",
+                        help="метка прогона, например режим сервера")
+    parser.add_argument("--output", help="файл для результатов в JSON")
+    args = parser.parse_args()
+    if args.size < SEQUENCE_SIZE:
+        # Меньше не поместится номер запроса, а отправленный размер
+        # разошёлся бы с записанным в результаты
+        parser.error(f"--size не меньше {SEQUENCE_SIZE} байт (номер запроса)")
+    if args.port is None:
+        args.port = 12345 if args.protocol == "tcp" else 12346
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    result = run_load(args)
+
+    latency = result["latency_ms"]
+    print(f"[*] {args.protocol.upper()} {args.host}:{args.port}, "
+          f"клиентов: {args.clients}, нагрузка: {args.size} байт")
+    print(f"[*] Запросов/с: {result['throughput_rps']:.1f}, "
+          f"Мбит/с: {result['throughput_mbps']:.2f}")
+    print(f"[*] Задержка, мс: p50={latency['p50']} p95={latency['p95']} "
+          f"p99={latency['p99']} p999={latency['p999']}")
+    print(f"[*] Отправлено: {result['sent']}, получено: {result['received']}, "
+          f"ошибок: {result['errors']}, потеряно: {result['lost']}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(result, file, ensure_ascii=False, indent=2)
+        print(f"[*] Результаты записаны в {args.output}")
@@ -1,17 +1,31 @@
+import argparse
+import collections
+import multiprocessing
+import os
+import selectors
 import socket
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
+from filetransfer import ERROR_SIZE, SIZE_HEADER, resolve_path, send_file
+from framing import FrameReader, encode_header, recv_frame, send_frame
+from handlers import HANDLERS, echo_handler
 
-def start_tcp_server():
-    server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+HOST = '127.0.0.1'
+PORT = 12345
+
+# Сколько неотправленных байт копим на клиента, прежде чем перестать читать
+MAX_PENDING = 4 * 1024 * 1024
 
-    # Параметры подключения
-    host = '127.0.0.1'
-    port = 12345
+
+def start_tcp_server(host=HOST, port=PORT, backlog=1, handler=echo_handler):
+    server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
 
     try:
         server_socket.bind((host, port))
 
-        server_socket.listen(1)
+        server_socket.listen(backlog)
         print(f"[*] TCP Сервер слушает на {host}:{port}")
 
         while True:
@@ -20,13 +34,17 @@ def start_tcp_server():
             print(f"[+] Принято подключение от {client_address}")
 
             try:
-                # Получаем данные от клиента
-                data = client_socket.recv(1024).decode()
-                print(f"[*] Получено: {data}")
+                reader = FrameReader()
+                while True:
+                    # Получаем кадр от клиента
+                    frame = recv_frame(client_socket, reader)
+                    if frame is None:
+                        break
+                    print(f"[*] Получено: {len(frame)} байт")
 
-                # Отправляем эхо-ответ
-                client_socket.send(data.encode())
-                print("[*] Отправлен эхо-ответ")
+                    # Отправляем ответ обработчика (по умолчанию эхо)
+                    send_frame(client_socket, handler(frame))
+                    print("[*] Отправлен ответ")
 
             except Exception as e:
                 print(f"[!] Ошибка при обработке клиента: {e}")
@@ -41,5 +59,331 @@ def start_tcp_server():
         server_socket.close()
 
 
+class Connection:
+    """Состояние одного клиента в мультиплексированном сервере"""
+
+    def __init__(self, sock, address):
+        self.sock = sock
+        self.address = address
+        self.reader = FrameReader()
+        self.outgoing = bytearray()
+        # Ответы из пула в порядке поступления запросов
+        self.pending = collections.deque()
+        self.events = selectors.EVENT_READ
+        self.closed = False
+
+
+class SelectorServer:
+    """Эхо-сервер на selectors (epoll/kqueue): много постоянных соединений.
+
+    Цикл ввода-вывода только режет поток на кадры и отправляет ответы,
+    а сами кадры обрабатывает handler - прямо в цикле или в пуле
+    потоков/процессов. Когда в пуле queue_size незавершённых задач,
+    сервер перестаёт читать из сокетов, пока очередь не разгрузится.
+    """
+
+    def __init__(self, host=HOST, port=PORT, backlog=1024,
+                 handler=echo_handler, backend="inline", workers=None,
+                 queue_size=1024):
+        self.host = host
+        self.port = port
+        self.backlog = backlog
+        self.handler = handler
+        self.queue_size = queue_size
+        if backend == "threads":
+            self.executor = ThreadPoolExecutor(max_workers=workers)
+        elif backend == "processes":
+            # spawn: дочерние процессы не наследуют сокеты сервера
+            self.executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"))
+        else:
+            self.executor = None
+
+        self.selector = selectors.DefaultSelector()
+        self.in_flight = 0
+        self.paused = set()
+        # Потоки пула будят цикл записью в socketpair
+        self.wakeup_recv, self.wakeup_send = socket.socketpair()
+        self.wakeup_recv.setblocking(False)
+        self.wakeup_send.setblocking(False)
+        self.completed = collections.deque()
+
+    def accept_client(self, server_socket):
+        # Принимаем всех ожидающих клиентов за один проход
+        while True:
+            try:
+                client_socket, client_address = server_socket.accept()
+            except BlockingIOError:
+                return
+            client_socket.setblocking(False)
+            client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.selector.register(client_socket, selectors.EVENT_READ,
+                                   Connection(client_socket, client_address))
+
+    def close_client(self, connection):
+        if connection.closed:
+            return
+        connection.closed = True
+        self.paused.discard(connection)
+        self.set_events(connection, 0)
+        connection.sock.close()
+
+    def queue_full(self):
+        return self.executor is not None and self.in_flight >= self.queue_size
+
+    def on_done(self, connection):
+        # Вызывается из потока пула
+        self.completed.append(connection)
+        try:
+            self.wakeup_send.send(b"\0")
+        except BlockingIOError:
+            pass
+
+    def process_frames(self, connection):
+        for frame in connection.reader.frames():
+            if self.executor is None:
+                response = self.handler(frame)
+                connection.outgoing += encode_header(len(response))
+                connection.outgoing += response
+            else:
+                # Кадр ссылается на буфер чтения, в пул отдаём копию
+                future = self.executor.submit(self.handler, bytes(frame))
+                connection.pending.append(future)
+                self.in_flight += 1
+                future.add_done_callback(
+                    lambda _, connection=connection: self.on_done(connection))
+                # Остальные кадры подождут в буфере, пока очередь не освободится
+                if self.queue_full():
+                    return
+
+    def collect_results(self, connection):
+        while connection.pending and connection.pending[0].done():
+            future = connection.pending.popleft()
+            self.in_flight -= 1
+            if connection.closed:
+                continue
+            try:
+                response = future.result()
+            except Exception as e:
+                print(f"[!] Ошибка обработчика для {connection.address}: {e}")
+                self.close_client(connection)
+                continue
+            connection.outgoing += encode_header(len(response))
+            connection.outgoing += response
+
+    def flush(self, connection):
+        if connection.outgoing:
+            try:
+                sent = connection.sock.send(connection.outgoing)
+            except BlockingIOError:
+                sent = 0
+            except ConnectionError:
+                self.close_client(connection)
+                return
+            del connection.outgoing[:sent]
+
+    def update_events(self, connection):
+        if connection.closed:
+            return
+        # Ждём готовности к записи только пока есть неотправленные данные,
+        # а чтение приостанавливаем, если клиент не забирает ответы
+        # или пул обработчиков переполнен
+        events = 0
+        if len(connection.outgoing) < MAX_PENDING:
+            if self.queue_full():
+                self.paused.add(connection)
+            else:
+                events |= selectors.EVENT_READ
+        if connection.outgoing:
+            events |= selectors.EVENT_WRITE
+        self.set_events(connection, events)
+
+    def set_events(self, connection, events):
+        # Селектор не принимает пустую маску, поэтому простаивающий
+        # клиент снимается с регистрации до возобновления чтения
+        if events == connection.events:
+            return
+        if not events:
+            self.selector.unregister(connection.sock)
+        elif not connection.events:
+            self.selector.register(connection.sock, events, connection)
+        else:
+            self.selector.modify(connection.sock, events, connection)
+        connection.events = events
+
+    def service_client(self, connection, mask):
+        if mask & selectors.EVENT_READ:
+            try:
+                received = connection.reader.read_from(connection.sock)
+            except BlockingIOError:
+                received = -1
+            except ConnectionError:
+                received = 0
+            if not received:
+                self.close_client(connection)
+                return
+            self.process_frames(connection)
+
+        self.flush(connection)
+        self.update_events(connection)
+
+    def on_wakeup(self):
+        try:
+            while self.wakeup_recv.recv(4096):
+                pass
+        except BlockingIOError:
+            pass
+
+        while self.completed:
+            connection = self.completed.popleft()
+            self.collect_results(connection)
+            if not connection.closed:
+                self.flush(connection)
+                self.update_events(connection)
+
+        # Очередь разгрузилась - возобновляем чтение приостановленных клиентов
+        if self.paused and not self.queue_full():
+            paused, self.paused = self.paused, set()
+            for connection in paused:
+                if connection.closed:
+                    continue
+                self.process_frames(connection)
+                self.flush(connection)
+                self.update_events(connection)
+
+    def serve_forever(self):
+        server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+
+        try:
+            server_socket.bind((self.host, self.port))
+            server_socket.listen(self.backlog)
+            server_socket.setblocking(False)
+            self.selector.register(server_socket, selectors.EVENT_READ, "accept")
+            self.selector.register(self.wakeup_recv, selectors.EVENT_READ, "wakeup")
+            print(f"[*] TCP Сервер (selectors) слушает на {self.host}:{self.port}, "
+                  f"backlog={self.backlog}")
+
+            while True:
+                for key, mask in self.selector.select():
+                    if key.data == "accept":
+                        self.accept_client(server_socket)
+                    elif key.data == "wakeup":
+                        self.on_wakeup()
+                    else:
+                        try:
+                            self.service_client(key.data, mask)
+                        except Exception as e:
+                            print(f"[!] Ошибка при обработке клиента "
+                                  f"{key.data.address}: {e}")
+                            self.close_client(key.data)
+
+        except KeyboardInterrupt:
+            pass
+        except Exception as e:
+            print(f"[!] Ошибка сервера: {e}")
+        finally:
+            for key in list(self.selector.get_map().values()):
+                key.fileobj.close()
+            self.selector.close()
+            self.wakeup_send.close()
+            if self.executor is not None:
+                self.executor.shutdown(cancel_futures=True)
+
+
+def start_selector_server(host=HOST, port=PORT, backlog=1024, **kwargs):
+    SelectorServer(host, port, backlog, **kwargs).serve_forever()
+
+
+def serve_file_client(client_socket, client_address, root):
+    reader = FrameReader()
+    try:
+        while True:
+            # Каждый кадр - имя файла относительно корневого каталога
+            frame = recv_frame(client_socket, reader)
+            if frame is None:
+                break
+            name = bytes(frame).decode()
+            try:
+                path = resolve_path(root, name)
+            except FileNotFoundError:
+                client_socket.sendall(SIZE_HEADER.pack(ERROR_SIZE))
+                send_frame(client_socket, f"Файл не найден: {name}".encode())
+                continue
+
+            started = time.perf_counter()
+            sent = send_file(client_socket, path)
+            elapsed = time.perf_counter() - started
+            print(f"[*] {client_address}: {name}, {sent} байт за {elapsed:.2f} с "
+                  f"({sent / elapsed / 1e6 if elapsed else 0:.1f} МБ/с)")
+    except Exception as e:
+        print(f"[!] Ошибка при обработке клиента {client_address}: {e}")
+    finally:
+        client_socket.close()
+
+
+def start_file_server(host=HOST, port=PORT, backlog=128, root="."):
+    """Отдаёт файлы из root через sendfile, по потоку на клиента"""
+    server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+
+    try:
+        server_socket.bind((host, port))
+        server_socket.listen(backlog)
+        print(f"[*] Файловый TCP Сервер слушает на {host}:{port}, "
+              f"каталог {os.path.abspath(root)}")
+
+        while True:
+            client_socket, client_address = server_socket.accept()
+            print(f"[+] Принято подключение от {client_address}")
+            threading.Thread(target=serve_file_client,
+                             args=(client_socket, client_address, root),
+                             daemon=True).start()
+
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:
+        print(f"[!] Ошибка сервера: {e}")
+    finally:
+        server_socket.close()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="TCP эхо-сервер")
+    parser.add_argument("--mode", choices=["simple", "selectors", "files"],
+                        default="simple",
+                        help="simple - один клиент за раз, "
+                             "selectors - мультиплексирование соединений, "
+                             "files - раздача файлов через sendfile")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--backlog", type=int,
+                        help="размер очереди listen() (по умолчанию 1 для "
+                             "simple и 1024 для selectors)")
+    parser.add_argument("--handler", choices=sorted(HANDLERS), default="echo",
+                        help="обработчик сообщений")
+    parser.add_argument("--backend", choices=["inline", "threads", "processes"],
+                        default="inline",
+                        help="где выполнять обработчик в режиме selectors")
+    parser.add_argument("--workers", type=int,
+                        help="размер пула потоков/процессов")
+    parser.add_argument("--queue-size", type=int, default=1024,
+                        help="сколько задач может ждать в пуле, прежде чем "
+                             "сервер перестанет читать из сокетов")
+    parser.add_argument("--root", default=".",
+                        help="каталог с файлами для режима files")
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
-    start_tcp_server()
+    args = parse_args()
+    handler = HANDLERS[args.handler]
+    if args.mode == "selectors":
+        start_selector_server(args.host, args.port, args.backlog or 1024,
+                              handler=handler, backend=args.backend,
+                              workers=args.workers, queue_size=args.queue_size)
+    elif args.mode == "files":
+        start_file_server(args.host, args.port, args.backlog or 128, args.root)
+    else:
+        start_tcp_server(args.host, args.port, args.backlog or 1, handler)
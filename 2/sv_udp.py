@@ -1,12 +1,18 @@
+import argparse
+import multiprocessing
+import os
 import socket
+import time
 
+HOST = '127.0.0.1'
+PORT = 12346
+
+# Максимальный размер UDP-датаграммы
+MAX_DATAGRAM = 65535
 
-def start_udp_server():
-    server_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
 
-    # Задаем параметры подключения
-    host = '127.0.0.1'
-    port = 12346
+def start_udp_server(host=HOST, port=PORT):
+    server_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
 
     try:
         # Привязываем сокет к адресу и порту
@@ -34,5 +40,108 @@ def start_udp_server():
         server_socket.close()
 
 
+def run_udp_worker(worker_id, host, port, stats_interval, log_every):
+    server_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    # Все воркеры слушают один порт, ядро раздаёт им датаграммы
+    server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+    server_socket.settimeout(stats_interval)
+
+    # Один буфер на всё время работы, без выделения памяти на пакет
+    buffer = bytearray(MAX_DATAGRAM)
+    view = memoryview(buffer)
+    recvfrom_into = server_socket.recvfrom_into
+    sendto = server_socket.sendto
+
+    packets = 0
+    total = 0
+    errors = 0
+    report_at = time.monotonic() + stats_interval
+
+    try:
+        server_socket.bind((host, port))
+        print(f"[*] Воркер {worker_id} (pid {os.getpid()}) слушает на {host}:{port}")
+
+        while True:
+            try:
+                size, client_address = recvfrom_into(buffer)
+                sendto(view[:size], client_address)
+                packets += 1
+                # Логируем только каждую log_every-ю датаграмму
+                if log_every and (total + packets) % log_every == 0:
+                    print(f"[*] Воркер {worker_id}: {size} байт от {client_address}")
+            except socket.timeout:
+                pass
+            except OSError as e:
+                errors += 1
+                if errors % 1000 == 1:
+                    print(f"[!] Воркер {worker_id}: ошибка при обработке сообщения: {e}")
+
+            now = time.monotonic()
+            if now >= report_at:
+                elapsed = now - report_at + stats_interval
+                if packets:
+                    total += packets
+                    print(f"[*] Воркер {worker_id}: {packets / elapsed:.0f} пакетов/с, "
+                          f"всего {total}, ошибок {errors}")
+                packets = 0
+                report_at = now + stats_interval
+
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:
+        print(f"[!] Ошибка воркера {worker_id}: {e}")
+    finally:
+        server_socket.close()
+
+
+def start_multiprocess_server(host=HOST, port=PORT, workers=None,
+                              stats_interval=5.0, log_every=0):
+    """Несколько процессов на одном порту через SO_REUSEPORT"""
+    workers = workers or os.cpu_count() or 1
+    processes = [
+        multiprocessing.Process(
+            target=run_udp_worker,
+            args=(worker_id, host, port, stats_interval, log_every)
+        )
+        for worker_id in range(workers)
+    ]
+    print(f"[*] UDP Сервер: запуск {workers} воркеров на {host}:{port}")
+    for process in processes:
+        process.start()
+
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+            process.join()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="UDP эхо-сервер")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--workers", type=int, default=0,
+                        help="число процессов с SO_REUSEPORT "
+                             "(0 - простой однопоточный режим, "
+                             "-1 - по числу ядер)")
+    parser.add_argument("--stats-interval", type=float, default=5.0,
+                        help="период вывода статистики в секундах")
+    parser.add_argument("--log-every", type=int, default=0,
+                        help="логировать каждую N-ю датаграмму (0 - не логировать)")
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
-    start_udp_server()
+    args = parse_args()
+    if args.workers:
+        start_multiprocess_server(args.host, args.port,
+                                  None if args.workers < 0 else args.workers,
+                                  args.stats_interval, args.log_every)
+    else:
+        start_udp_server(args.host, args.port)
@@ -1,33 +1,42 @@
 import sqlite3
 import requests
 import os
+import sys
+import time
+from itertools import islice
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DB_PATH = os.path.join(BASE_DIR, 'blog.db')
 
+# Сколько строк записывать в одной транзакции
+BATCH_SIZE = 1000
+
+sys.path.append(os.path.dirname(BASE_DIR))
+
+from common.blog_db import (  # noqa: E402
+    get_database, migrate, save_changed_posts, search_posts
+)
+from common.http_cache import default_cache  # noqa: E402
+from common.json_stream import iter_json_array  # noqa: E402
+
 
 def create_database():
     connection = None
 
     try:
-        if os.path.exists(DB_PATH):
+        exists = os.path.exists(DB_PATH)
+        if exists:
             print("База данных уже существует")
-            return
 
+        # Существующую базу не пересоздаём, а доводим схему до актуальной
         connection = sqlite3.connect(DB_PATH)
-        cursor = connection.cursor()
-
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS posts (
-                id INTEGER PRIMARY KEY,
-                user_id INTEGER,
-                title TEXT,
-                body TEXT
-            )
-        ''')
+        old_version, new_version = migrate(connection)
 
-        connection.commit()
-        print("База данных успешно создана")
+        if not exists:
+            print("База данных успешно создана")
+        elif new_version != old_version:
+            print(f"Схема базы данных обновлена с версии {old_version} "
+                  f"до {new_version}")
 
     except sqlite3.Error as error:
         print("Ошибка при создании базы данных:", error)
@@ -36,47 +45,71 @@ def create_database():
             connection.close()
 
 
-def fetch_posts():
+def fetch_posts(cache=None, url='https://jsonplaceholder.typicode.com/posts'):
+    """Возвращает итератор постов, которые разбираются по мере чтения ответа"""
     try:
-        response = requests.get('https://jsonplaceholder.typicode.com/posts')
+        if cache is not None:
+            response = cache.get(url, stream=True)
+        else:
+            response = requests.get(url, stream=True)
         response.raise_for_status()
-        return response.json()
     except requests.RequestException as error:
         print("Ошибка при получении данных:", error)
         return None
 
+    return iter_json_array(response.iter_content(chunk_size=64 * 1024))
 
-def save_posts(posts):
-    if not posts:
+
+def save_posts(posts, batch_size=BATCH_SIZE):
+    if posts is None:
         return
 
-    connection = None
+    started = time.perf_counter()
+    saved = 0
+    written = 0
     try:
-        connection = sqlite3.connect(DB_PATH)
-        cursor = connection.cursor()
+        # Долгоживущее соединение: подготовленные выражения переиспользуются
+        connection = get_database(DB_PATH).connection()
 
-        cursor.executemany(
-            'INSERT OR REPLACE INTO posts (id, user_id, title, body) VALUES (?, ?, ?, ?)',
-            [(post['id'], post['userId'], post['title'], post['body']) for post in posts]
+        rows = (
+            (post['id'], post['userId'], post['title'], post['body'])
+            for post in posts
         )
-
-        connection.commit()
-        print(f"Успешно сохранено {len(posts)} постов")
+        # Пишем пачками по batch_size строк, каждая пачка - одна транзакция,
+        # так что в памяти одновременно не больше одной пачки
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                break
+            # Посты, чей хэш содержимого не изменился, не перезаписываются
+            with connection:
+                result = save_changed_posts(connection, batch)
+            saved += len(batch)
+            written += result['new'] + result['changed']
 
     except sqlite3.Error as error:
         print("Ошибка при сохранении данных:", error)
-    finally:
-        if connection:
-            connection.close()
+        print(f"До ошибки сохранено {saved} постов")
+        return
+    except (requests.RequestException, ValueError) as error:
+        # Оборванная или битая лента - не успешная загрузка
+        print("Ошибка при получении данных:", error)
+        print(f"До ошибки сохранено {saved} постов")
+        return
+
+    elapsed = time.perf_counter() - started
+    rate = saved / elapsed if elapsed else 0
+    print(f"Успешно сохранено {saved} постов за {elapsed:.2f} с ({rate:.0f} строк/с), "
+          f"из них новых или изменённых: {written}")
 
 
 def get_user_posts(user_id):
-    connection = None
     try:
-        connection = sqlite3.connect(DB_PATH)
-        cursor = connection.cursor()
-
-        cursor.execute('SELECT * FROM posts WHERE user_id = ?', (user_id,))
+        connection = get_database(DB_PATH).connection()
+        cursor = connection.execute(
+            'SELECT id, user_id, title, body FROM posts WHERE user_id = ? ORDER BY id',
+            (user_id,)
+        )
         posts = cursor.fetchall()
 
         return posts
@@ -84,16 +117,25 @@ def get_user_posts(user_id):
     except sqlite3.Error as error:
         print("Ошибка при получении постов пользователя:", error)
         return []
-    finally:
-        if connection:
-            connection.close()
+
+
+def find_posts(text, limit=10):
+    try:
+        return search_posts(get_database(DB_PATH).connection(), text, limit)
+    except sqlite3.Error as error:
+        print("Ошибка при поиске постов:", error)
+        return []
 
 
 def main():
     create_database()
-    posts = fetch_posts()
-    if posts:
-        save_posts(posts)
+    cache = default_cache()
+    posts = fetch_posts(cache)
+    save_posts(posts)
+    stats = cache.stats()
+    print(f"Кэш: попаданий {stats['hits']}, промахов {stats['misses']}, "
+          f"сэкономлено байт {stats['bytes_saved']}")
+    cache.close()
 
     user_id = int(input("Введите ID запрашиваемого пользователя: "))
     user_posts = get_user_posts(user_id)
@@ -104,6 +146,19 @@ def main():
         print(f"Текст: {post[3]}...")
         print("-" * 50)
 
+    # Полнотекстовый поиск: слова ищутся по префиксу, "фразы" - целиком
+    text = input("Введите поисковый запрос (Enter - пропустить): ").strip()
+    if text:
+        found = find_posts(text)
+        print(f"\nНайдено по запросу «{text}»: {len(found)}")
+        for post_id, user_id, title, snippet, rank in found:
+            print(f"ID: {post_id} (пользователь {user_id}, релевантность {-rank:.2f})")
+            print(f"Заголовок: {title}")
+            print(f"Фрагмент: {snippet}")
+            print("-" * 50)
+
+    get_database(DB_PATH).close()
+
 
 if __name__ == "__main__":
     main()
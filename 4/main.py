@@ -1,16 +1,29 @@
+import collections
 import os
 import sys
 import sqlite3
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
-    QPushButton, QLineEdit, QTableView, QDialog, QFormLayout
+    QPushButton, QLineEdit, QTableView, QDialog, QFormLayout, QShortcut
 )
-from PyQt5.QtSql import QSqlDatabase, QSqlTableModel
-from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QKeySequence
+from PyQt5.QtCore import Qt, QObject, QRunnable, QThreadPool, QTimer, pyqtSignal
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DB_PATH = os.path.join(BASE_DIR, 'blog.db')
 
+# Пауза после последнего нажатия клавиши перед запуском поиска, мс
+SEARCH_DEBOUNCE_MS = 250
+# Сколько самых релевантных постов показывать в результатах поиска
+SEARCH_LIMIT = 1000
+# Сколько последних операций добавления/удаления можно отменить
+UNDO_LIMIT = 20
+
+sys.path.append(os.path.dirname(BASE_DIR))
+
+from common.blog_db import get_database, migrate, search_post_ids  # noqa: E402
+from posts_model import PostsTableModel  # noqa: E402
+
 
 class DatabaseConnection:
     def __init__(self, db_name="blog.db"):
@@ -21,7 +34,7 @@ class DatabaseConnection:
 
     def connect(self):
         try:
-            self.connection = sqlite3.connect(self.db_name)
+            self.connection = get_database(self.db_name).connection()
             return True
         except sqlite3.Error as e:
             print(f"Ошибка подключения к БД: {e}")
@@ -29,28 +42,24 @@ class DatabaseConnection:
 
     def disconnect(self):
         if self.connection:
-            self.connection.close()
+            get_database(self.db_name).close()
+            self.connection = None
 
     def create_database(self):
-        """Создание базы данных и таблицы posts"""
+        """Создание базы данных и обновление схемы таблицы posts"""
         # Проверяем, существует ли база данных
-        if os.path.exists(self.db_name):
+        exists = os.path.exists(self.db_name)
+        if exists:
             print("База данных уже существует")
-            return
 
         try:
             self.connection = sqlite3.connect(self.db_name)
-            cursor = self.connection.cursor()
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS posts (
-                    id INTEGER PRIMARY KEY,
-                    user_id INTEGER,
-                    title TEXT,
-                    body TEXT
-                )
-            ''')
-            self.connection.commit()
-            print("База данных успешно создана")
+            old_version, new_version = migrate(self.connection)
+            if not exists:
+                print("База данных успешно создана")
+            elif new_version != old_version:
+                print(f"Схема базы данных обновлена с версии {old_version} "
+                      f"до {new_version}")
         except sqlite3.Error as error:
             print("Ошибка при создании базы данных:", error)
         finally:
@@ -58,6 +67,46 @@ class DatabaseConnection:
                 self.connection.close()
 
 
+class SearchSignals(QObject):
+    finished = pyqtSignal(int, list)
+    failed = pyqtSignal(int, str)
+
+
+class SearchTask(QRunnable):
+    """Поиск по posts_fts в пуле потоков; устаревший запрос можно отменить"""
+
+    def __init__(self, db_name, generation, text, limit=SEARCH_LIMIT):
+        super().__init__()
+        self.db_name = db_name
+        self.generation = generation
+        self.text = text
+        self.limit = limit
+        self.cancelled = False
+        self.signals = SearchSignals()
+
+    def cancel(self):
+        self.cancelled = True
+
+    def run(self):
+        if self.cancelled:
+            return
+        # У каждого потока пула своё долгоживущее соединение
+        connection = get_database(self.db_name).connection()
+        # SQLite периодически вызывает обработчик; ненулевой ответ прерывает запрос
+        connection.set_progress_handler(lambda: int(self.cancelled), 1000)
+        try:
+            post_ids = search_post_ids(connection, self.text, self.limit)
+        except sqlite3.Error as e:
+            if not self.cancelled:
+                self.signals.failed.emit(self.generation, str(e))
+            return
+        finally:
+            connection.set_progress_handler(None, 0)
+
+        if not self.cancelled:
+            self.signals.finished.emit(self.generation, post_ids)
+
+
 class AddRecordDialog(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -101,6 +150,20 @@ class MainWindow(QMainWindow):
             print("Не удалось подключиться к базе данных")
             sys.exit(1)
 
+        self.search_pool = QThreadPool()
+        self.search_pool.setMaxThreadCount(1)
+        # Поток пула держит своё соединение с базой - не даём ему истечь
+        self.search_pool.setExpiryTimeout(-1)
+        self.search_task = None
+        self.search_generation = 0
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DEBOUNCE_MS)
+        self.search_timer.timeout.connect(self.start_search)
+
+        # Отмена: ("delete", удалённые строки) или ("insert", id добавленных)
+        self.undo_stack = collections.deque(maxlen=UNDO_LIMIT)
+
         self.setup_ui()
         self.setup_database()
 
@@ -110,7 +173,7 @@ class MainWindow(QMainWindow):
         layout = QVBoxLayout(central_widget)
 
         self.search_field = QLineEdit()
-        self.search_field.setPlaceholderText("Поиск по заголовку...")
+        self.search_field.setPlaceholderText("Поиск по заголовку и тексту...")
         self.search_field.textChanged.connect(self.search_posts)
         layout.addWidget(self.search_field)
 
@@ -121,77 +184,143 @@ class MainWindow(QMainWindow):
         self.refresh_button = QPushButton("Обновить")
         self.add_button = QPushButton("Добавить")
         self.delete_button = QPushButton("Удалить")
+        self.undo_button = QPushButton("Отменить")
+        self.undo_button.setEnabled(False)
         self.refresh_button.clicked.connect(self.refresh_data)
         self.add_button.clicked.connect(self.add_record)
         self.delete_button.clicked.connect(self.delete_record)
+        self.undo_button.clicked.connect(self.undo)
         button_layout.addWidget(self.refresh_button)
         button_layout.addWidget(self.add_button)
         button_layout.addWidget(self.delete_button)
+        button_layout.addWidget(self.undo_button)
         layout.addLayout(button_layout)
 
-    def setup_database(self):
-        db = QSqlDatabase.addDatabase("QSQLITE")
-        db.setDatabaseName(self.db.db_name)
-
-        if not db.open():
-            print("Не удалось открыть базу данных.")
-            return
+        QShortcut(QKeySequence.Undo, self, self.undo)
 
-        self.db_model = QSqlTableModel()
-        self.db_model.setTable("posts")
-        self.db_model.select()
-        self.db_model.setEditStrategy(QSqlTableModel.OnFieldChange)
-        self.db_model.setHeaderData(0, Qt.Horizontal, "ID")
-        self.db_model.setHeaderData(1, Qt.Horizontal, "User ID")
-        self.db_model.setHeaderData(2, Qt.Horizontal, "Title")
-        self.db_model.setHeaderData(3, Qt.Horizontal, "Body")
+    def setup_database(self):
+        # Своя ленивая модель вместо QSqlTableModel: строки подгружаются
+        # страницами, поэтому открытие не зависит от размера таблицы
+        self.db_model = PostsTableModel(self.db.db_name, self)
         self.table_view.setModel(self.db_model)
         self.table_view.setSelectionBehavior(self.table_view.SelectRows)
+        self.table_view.setSortingEnabled(True)
+        self.table_view.sortByColumn(0, Qt.AscendingOrder)
+        self.table_view.horizontalHeader().sortIndicatorChanged.connect(
+            self.on_sort_indicator_changed)
+
+    def on_sort_indicator_changed(self, column, order):
+        # Модель не сортирует по этой колонке - возвращаем индикатор
+        # на действующий порядок, чтобы заголовок не врал
+        if not self.db_model.can_sort(column):
+            header = self.table_view.horizontalHeader()
+            header.blockSignals(True)
+            header.setSortIndicator(self.db_model.sort_column, self.db_model.sort_order())
+            header.blockSignals(False)
 
     def search_posts(self, text):
-        self.db_model.setFilter(f"title LIKE '%{text}%'")
-        self.db_model.select()
+        # Каждое нажатие лишь перезапускает таймер: поиск стартует,
+        # когда пользователь перестал печатать
+        self.search_timer.start()
+
+    def start_search(self):
+        # Предыдущий запрос больше не нужен - прерываем его
+        if self.search_task is not None:
+            self.search_task.cancel()
+        self.search_generation += 1
+
+        text = self.search_field.text()
+        if not text.strip():
+            self.search_task = None
+            self.apply_search_results(self.search_generation, None)
+            return
+
+        self.search_task = SearchTask(self.db.db_name, self.search_generation, text)
+        self.search_task.signals.finished.connect(self.apply_search_results)
+        self.search_task.signals.failed.connect(self.on_search_failed)
+        self.search_pool.start(self.search_task)
+
+    def apply_search_results(self, generation, post_ids):
+        if generation != self.search_generation:
+            return
+        # Пользовательский текст попадает в SQL лишь как параметр запроса
+        # в SearchTask, модель получает готовый список id
+        self.db_model.set_filter_ids(post_ids)
+        self.statusBar().showMessage(f"Записей: {self.db_model.rowCount()}")
+
+    def on_search_failed(self, generation, error):
+        if generation == self.search_generation:
+            self.statusBar().showMessage(f"Ошибка поиска: {error}")
 
     def refresh_data(self):
-        self.db_model.select()
+        self.db_model.refresh()
+
+    def closeEvent(self, event):
+        # Не даём фоновым задачам пережить окно и его объекты сигналов
+        if self.search_task is not None:
+            self.search_task.cancel()
+        self.search_pool.waitForDone()
+        self.db_model.count_pool.waitForDone()
+        super().closeEvent(event)
 
     def add_record(self):
         dialog = AddRecordDialog(self)
         if dialog.exec_():
             data = dialog.get_data()
             if data["user_id"] and data["title"] and data["body"]:
-                row = self.db_model.rowCount()
-                self.db_model.insertRow(row)
-                self.db_model.setData(self.db_model.index(
-                    row, 1), int(data["user_id"]))
-                self.db_model.setData(
-                    self.db_model.index(row, 2), data["title"])
-                self.db_model.setData(
-                    self.db_model.index(row, 3), data["body"])
-                if not self.db_model.submitAll():
-                    print("Ошибка добавления записи:",
-                          self.db_model.lastError().text())
+                try:
+                    post_ids = self.db_model.insert_posts(
+                        [(None, int(data["user_id"]), data["title"], data["body"])])
+                except (sqlite3.Error, ValueError) as e:
+                    print("Ошибка добавления записи:", e)
                 else:
-                    self.refresh_data()
+                    self.push_undo("insert", post_ids)
 
     def delete_record(self):
         selected_rows = self.table_view.selectionModel().selectedRows()
         if not selected_rows:
             print("Нет выбранных записей для удаления.")
             return
-        for index in selected_rows:
-            self.db_model.removeRow(index.row())
-        if not self.db_model.submitAll():
-            print("Ошибка удаления записи:", self.db_model.lastError().text())
+        # Одна транзакция на всё выделение; модель убирает строки на месте
+        try:
+            deleted = self.db_model.delete_rows(index.row() for index in selected_rows)
+        except sqlite3.Error as e:
+            print("Ошибка удаления записи:", e)
+        else:
+            self.table_view.clearSelection()
+            self.push_undo("delete", deleted)
+            self.statusBar().showMessage(f"Удалено записей: {len(deleted)}")
+
+    def push_undo(self, action, data):
+        if data:
+            self.undo_stack.append((action, data))
+        self.undo_button.setEnabled(bool(self.undo_stack))
+
+    def undo(self):
+        if not self.undo_stack:
+            return
+        action, data = self.undo_stack.pop()
+        try:
+            if action == "delete":
+                # Возвращаем посты с прежними id
+                self.db_model.insert_posts(data)
+            else:
+                self.db_model.delete_ids(data)
+        except sqlite3.Error as e:
+            print("Ошибка отмены:", e)
+            self.undo_stack.append((action, data))
         else:
-            self.refresh_data()
+            self.statusBar().showMessage(f"Отменено записей: {len(data)}")
+        self.undo_button.setEnabled(bool(self.undo_stack))
 
 
 def main():
     app = QApplication(sys.argv)
     window = MainWindow()
     window.show()
-    sys.exit(app.exec_())
+    exit_code = app.exec_()
+    window.db.disconnect()
+    sys.exit(exit_code)
 
 
 if __name__ == "__main__":
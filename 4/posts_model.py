@@ -0,0 +1,513 @@
+import collections
+import sqlite3
+
+from PyQt5.QtCore import (
+    QAbstractTableModel, QModelIndex, QObject, QRunnable, QThreadPool, QTimer,
+    Qt, pyqtSignal
+)
+
+from common.blog_db import get_database
+
+COLUMNS = ["id", "user_id", "title", "body"]
+HEADERS = ["ID", "User ID", "Title", "Body"]
+
+# Строк в одной странице и сколько страниц держать в LRU-кэше
+PAGE_SIZE = 200
+MAX_CACHED_PAGES = 50
+# Больше разрозненных диапазонов удаления - сбрасываем модель целиком
+MAX_REMOVE_RANGES = 1000
+
+# Колонки, по которым есть индекс; к ключу всегда добавляется id,
+# чтобы порядок был однозначным (id - это rowid, он уже есть в индексе)
+SORT_EXPRESSIONS = {
+    0: None,
+    1: "user_id",
+    2: "title COLLATE NOCASE",
+}
+
+
+def estimate_row_count(connection):
+    """Число строк из статистики ANALYZE - без прохода по таблице"""
+    row = connection.execute(
+        "SELECT stat FROM sqlite_stat1 WHERE tbl = 'posts' AND idx = 'posts_user_id'"
+    ).fetchone()
+    if row:
+        return int(row[0].split()[0])
+    return connection.execute("SELECT count(*) FROM posts").fetchone()[0]
+
+
+class CountSignals(QObject):
+    finished = pyqtSignal(int, int)
+
+
+class CountTask(QRunnable):
+    """Точный подсчёт строк в фоне, пока модель работает по оценке"""
+
+    def __init__(self, db_name, generation):
+        super().__init__()
+        self.db_name = db_name
+        self.generation = generation
+        self.signals = CountSignals()
+
+    def run(self):
+        try:
+            connection = get_database(self.db_name).connection()
+            count = connection.execute("SELECT count(*) FROM posts").fetchone()[0]
+        except sqlite3.Error as e:
+            print(f"Ошибка подсчёта записей: {e}")
+            return
+        self.signals.finished.emit(self.generation, count)
+
+
+class PostsTableModel(QAbstractTableModel):
+    """Ленивая модель таблицы posts.
+
+    Строки подгружаются страницами по ключу сортировки (keyset), а не
+    через OFFSET от начала, и хранятся в ограниченном LRU-кэше. Для каждой
+    страницы запоминается ключ её первой строки; при прыжке в середину
+    таблицы позиция ищется от ближайшей известной страницы по индексу.
+    """
+
+    def __init__(self, db_name, parent=None):
+        super().__init__(parent)
+        self.db_name = db_name
+        self.sort_column = 0
+        self.descending = False
+        self.filter_ids = None
+        self.count_pool = QThreadPool()
+        self.count_pool.setMaxThreadCount(1)
+        # Поток пула держит своё соединение с базой - не даём ему истечь
+        self.count_pool.setExpiryTimeout(-1)
+        self.count_generation = 0
+        self.count_task = None
+        self.reset_state()
+
+    def connection(self):
+        return get_database(self.db_name).connection()
+
+    # --- Интерфейс QAbstractTableModel ---
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.row_count
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return HEADERS[section]
+        return super().headerData(section, orientation, role)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role not in (Qt.DisplayRole, Qt.EditRole):
+            return None
+        row = self.row_at(index.row())
+        return None if row is None else row[index.column()]
+
+    def flags(self, index):
+        flags = super().flags(index)
+        if index.isValid() and index.column() != 0:
+            flags |= Qt.ItemIsEditable
+        return flags
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if role != Qt.EditRole or not index.isValid() or index.column() == 0:
+            return False
+        row = self.row_at(index.row())
+        if row is None:
+            return False
+        if index.column() == 1:
+            try:
+                value = int(value)
+            except (TypeError, ValueError):
+                return False
+        try:
+            connection = self.connection()
+            with connection:
+                connection.execute(
+                    f"UPDATE posts SET {COLUMNS[index.column()]} = ? WHERE id = ?",
+                    (value, row[0]))
+        except sqlite3.Error as e:
+            print(f"Ошибка сохранения изменений: {e}")
+            return False
+
+        # Обновляем строку в кэше; на место в сортировке это не влияет
+        # до следующего обновления, как в обычной таблице
+        page, offset = divmod(index.row(), PAGE_SIZE)
+        rows = self.pages.get(page)
+        if rows is not None and offset < len(rows):
+            updated = list(rows[offset])
+            updated[index.column()] = value
+            rows[offset] = tuple(updated)
+        self.dataChanged.emit(index, index, [Qt.DisplayRole, Qt.EditRole])
+        return True
+
+    def can_sort(self, column):
+        # По тексту поста индекса нет: сортировка читала бы всю таблицу
+        return column in SORT_EXPRESSIONS
+
+    def sort_order(self):
+        return Qt.DescendingOrder if self.descending else Qt.AscendingOrder
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        if not self.can_sort(column):
+            return
+        self.beginResetModel()
+        self.sort_column = column
+        self.descending = order == Qt.DescendingOrder
+        if self.filter_ids is not None:
+            self.filter_ids = self.sorted_ids(self.filter_ids)
+        self.reset_state(keep_count=True)
+        self.endResetModel()
+
+    # --- Публичные операции ---
+
+    def refresh(self):
+        self.beginResetModel()
+        if self.filter_ids is not None:
+            # Порядок результатов сохраняем, убираем только удалённые посты
+            existing = set(self.sorted_ids(self.filter_ids))
+            self.filter_ids = [i for i in self.filter_ids if i in existing]
+        self.reset_state()
+        self.endResetModel()
+
+    def set_filter_ids(self, post_ids):
+        """Показывать только указанные посты (None - все) в заданном порядке"""
+        self.beginResetModel()
+        self.filter_ids = None if post_ids is None else list(post_ids)
+        self.reset_state()
+        self.endResetModel()
+
+    def post_id(self, row):
+        data = self.row_at(row)
+        return None if data is None else data[0]
+
+    def delete_rows(self, rows):
+        """Удаляет строки одной транзакцией и возвращает удалённые посты.
+
+        id собираются во временную таблицу, а удаление идёт одним
+        DELETE ... WHERE id IN (SELECT ...) вместо запроса на строку.
+        """
+        selected = [(row, self.post_id(row)) for row in sorted(set(rows))]
+        selected = [(row, post_id) for row, post_id in selected if post_id is not None]
+        if not selected:
+            return []
+        rows = [row for row, _ in selected]
+        post_ids = [post_id for _, post_id in selected]
+
+        connection = self.connection()
+        with connection:
+            self.select_ids(connection, post_ids)
+            deleted = connection.execute(
+                "SELECT id, user_id, title, body FROM posts "
+                "WHERE id IN (SELECT id FROM temp.selected_ids)").fetchall()
+            connection.execute(
+                "DELETE FROM posts WHERE id IN (SELECT id FROM temp.selected_ids)")
+
+        self.remove_positions(rows)
+        return deleted
+
+    def insert_posts(self, posts):
+        """Вставляет посты одной транзакцией; возвращает их id.
+
+        posts - кортежи (id, user_id, title, body); id может быть None,
+        тогда его назначит база.
+        """
+        if not posts:
+            return []
+        connection = self.connection()
+        known = [post for post in posts if post[0] is not None]
+        post_ids = [post[0] for post in known]
+        with connection:
+            connection.executemany(
+                "INSERT INTO posts (id, user_id, title, body) VALUES (?, ?, ?, ?)", known)
+            # id новых постов назначает база - узнаём их по одному
+            for post in posts:
+                if post[0] is None:
+                    cursor = connection.execute(
+                        "INSERT INTO posts (id, user_id, title, body) VALUES (?, ?, ?, ?)",
+                        post)
+                    post_ids.append(cursor.lastrowid)
+            self.select_ids(connection, post_ids)
+
+        if self.filter_ids is not None:
+            # Новые посты могут не подходить под поиск - пересобираем выборку
+            self.refresh()
+            return post_ids
+
+        position = self.first_selected_position(connection)
+        self.invalidate_from(position)
+        self.beginInsertRows(QModelIndex(), position, position + len(post_ids) - 1)
+        self.row_count += len(post_ids)
+        self.endInsertRows()
+        self.recount()
+        return post_ids
+
+    def delete_ids(self, post_ids):
+        """Удаляет посты по id одной транзакцией (отмена вставки)"""
+        connection = self.connection()
+        with connection:
+            self.select_ids(connection, post_ids)
+            position = self.first_selected_position(connection)
+            count = connection.execute(
+                "DELETE FROM posts WHERE id IN (SELECT id FROM temp.selected_ids)"
+            ).rowcount
+
+        if self.filter_ids is not None:
+            self.refresh()
+        elif count:
+            # Сообщаем об удалении одним блоком с первой позиции: всё
+            # после неё всё равно перечитается из базы
+            self.invalidate_from(position)
+            self.beginRemoveRows(QModelIndex(), position, position + count - 1)
+            self.row_count -= count
+            self.endRemoveRows()
+            self.recount()
+        return count
+
+    def remove_positions(self, rows):
+        """Убирает из модели строки (номера по возрастанию) без полной перезагрузки"""
+        if self.filter_ids is not None:
+            removed = set(rows)
+            self.filter_ids = [post_id for row, post_id in enumerate(self.filter_ids)
+                               if row not in removed]
+        self.invalidate_from(rows[0])
+
+        # Сообщаем представлению о непрерывных диапазонах, начиная с конца,
+        # чтобы номера ещё не обработанных строк не сдвигались
+        ranges = []
+        for row in rows:
+            if ranges and ranges[-1][1] == row - 1:
+                ranges[-1][1] = row
+            else:
+                ranges.append([row, row])
+        if len(ranges) > MAX_REMOVE_RANGES:
+            # Разрозненное выделение: один сброс дешевле тысяч сигналов
+            self.beginResetModel()
+            self.row_count -= len(rows)
+            self.endResetModel()
+            self.recount()
+            return
+        for first, last in reversed(ranges):
+            self.beginRemoveRows(QModelIndex(), first, last)
+            self.row_count -= last - first + 1
+            self.endRemoveRows()
+        self.recount()
+
+    # --- Внутреннее устройство ---
+
+    def reset_state(self, keep_count=False):
+        self.pages = collections.OrderedDict()
+        # Начало каждой известной страницы: (ключ, включительно) или None
+        self.anchors = {0: None}
+        if self.filter_ids is not None:
+            self.row_count = len(self.filter_ids)
+            self.count_exact = True
+            return
+        if keep_count:
+            return
+        try:
+            self.row_count = estimate_row_count(self.connection())
+        except sqlite3.Error as e:
+            print(f"Ошибка подсчёта записей: {e}")
+            self.row_count = 0
+        self.count_exact = False
+        self.start_exact_count()
+
+    def select_ids(self, connection, post_ids):
+        """Складывает id во временную таблицу для запросов WHERE id IN (SELECT ...)
+
+        Так число id не упирается в лимит параметров одного запроса.
+        """
+        connection.execute(
+            "CREATE TEMP TABLE IF NOT EXISTS selected_ids (id INTEGER PRIMARY KEY)")
+        connection.execute("DELETE FROM temp.selected_ids")
+        connection.executemany(
+            "INSERT OR IGNORE INTO temp.selected_ids (id) VALUES (?)",
+            [(post_id,) for post_id in post_ids])
+
+    def first_selected_position(self, connection):
+        """Номер строки, на которой стоит первый из постов в temp.selected_ids"""
+        first = connection.execute(
+            "SELECT id, user_id, title, body FROM posts "
+            "WHERE id IN (SELECT id FROM temp.selected_ids) "
+            f"ORDER BY {self.order_by()} LIMIT 1").fetchone()
+        if first is None:
+            return self.row_count
+        # Считаем строки до её ключа - по индексу, без чтения самих строк
+        where, params = self.after(self.key_of(first), False, reverse=True)
+        return connection.execute(
+            f"SELECT count(*) FROM posts WHERE {where}", params).fetchone()[0]
+
+    def invalidate_from(self, position):
+        """Забывает страницы и ключи, сдвинувшиеся после изменения в position.
+
+        Строки до position не менялись, поэтому страницы и ключи перед
+        ними остаются верными.
+        """
+        for page in [p for p in self.pages if (p + 1) * PAGE_SIZE > position]:
+            del self.pages[page]
+        for page in [p for p in self.anchors if p and p * PAGE_SIZE >= position]:
+            del self.anchors[page]
+
+    def recount(self):
+        # Подсчёт, запущенный до изменения, вернул бы устаревшее число
+        if not self.count_exact:
+            self.start_exact_count()
+
+    def start_exact_count(self):
+        self.count_generation += 1
+        self.count_task = CountTask(self.db_name, self.count_generation)
+        self.count_task.signals.finished.connect(self.on_exact_count)
+        self.count_pool.start(self.count_task)
+
+    def on_exact_count(self, generation, count):
+        if generation == self.count_generation and self.filter_ids is None:
+            self.set_exact_count(count)
+
+    def set_exact_count(self, count):
+        if count > self.row_count:
+            self.beginInsertRows(QModelIndex(), self.row_count, count - 1)
+            self.row_count = count
+            self.endInsertRows()
+        elif count < self.row_count:
+            self.beginRemoveRows(QModelIndex(), count, self.row_count - 1)
+            self.row_count = count
+            self.endRemoveRows()
+        self.count_exact = True
+
+    def direction(self, reverse=False):
+        return "DESC" if self.descending != reverse else "ASC"
+
+    def order_by(self, reverse=False):
+        direction = self.direction(reverse)
+        expression = SORT_EXPRESSIONS[self.sort_column]
+        if expression is None:
+            return f"id {direction}"
+        return f"{expression} {direction}, id {direction}"
+
+    def key_columns(self):
+        if SORT_EXPRESSIONS[self.sort_column] is None:
+            return "id"
+        return f"{COLUMNS[self.sort_column]}, id"
+
+    def key_of(self, row):
+        if SORT_EXPRESSIONS[self.sort_column] is None:
+            return (row[0],)
+        return (row[self.sort_column], row[0])
+
+    def after(self, key, inclusive, reverse=False):
+        """Условие «строки после ключа» в текущем порядке сортировки.
+
+        Записано через >= по первой колонке, чтобы SQLite искал по индексу,
+        а не проверял сравнение кортежей на каждой строке. С reverse=True -
+        строки до ключа.
+        """
+        op = "<" if self.descending != reverse else ">"
+        id_op = op + "=" if inclusive else op
+        expression = SORT_EXPRESSIONS[self.sort_column]
+        if expression is None:
+            return f"id {id_op} ?", [key[0]]
+        return (f"{expression} {op}= ? AND ({expression} {op} ? OR id {id_op} ?)",
+                [key[0], key[0], key[1]])
+
+    def find_start(self, page):
+        if page in self.anchors:
+            return self.anchors[page]
+
+        position = page * PAGE_SIZE
+        if self.count_exact and self.row_count - position < position:
+            # Ближе к концу - отсчитываем от последней строки в обратном порядке
+            sql = (f"SELECT {self.key_columns()} FROM posts "
+                   f"ORDER BY {self.order_by(reverse=True)} LIMIT 1 OFFSET ?")
+            params = [self.row_count - 1 - position]
+        else:
+            known = max(p for p in self.anchors if p < page)
+            sql = f"SELECT {self.key_columns()} FROM posts"
+            params = []
+            if self.anchors[known] is not None:
+                where, params = self.after(*self.anchors[known])
+                sql += f" WHERE {where}"
+            sql += f" ORDER BY {self.order_by()} LIMIT 1 OFFSET ?"
+            params.append((page - known) * PAGE_SIZE)
+
+        row = self.connection().execute(sql, params).fetchone()
+        if row is None:
+            return False
+        self.anchors[page] = (tuple(row), True)
+        return self.anchors[page]
+
+    def load_page(self, page):
+        if self.filter_ids is not None:
+            return self.load_filtered_page(page)
+
+        start = self.find_start(page)
+        if start is False:
+            return []
+        sql = "SELECT id, user_id, title, body FROM posts"
+        params = []
+        if start is not None:
+            where, params = self.after(*start)
+            sql += f" WHERE {where}"
+        sql += f" ORDER BY {self.order_by()} LIMIT {PAGE_SIZE}"
+        rows = self.connection().execute(sql, params).fetchall()
+
+        if len(rows) == PAGE_SIZE:
+            # Следующая страница начинается сразу после последней строки этой
+            self.anchors.setdefault(page + 1, (self.key_of(rows[-1]), False))
+        elif page * PAGE_SIZE + len(rows) != self.row_count:
+            # Дошли до конца таблицы раньше оценки - уточняем число строк,
+            # но не посреди отрисовки, а следующим событием цикла
+            count = page * PAGE_SIZE + len(rows)
+            QTimer.singleShot(0, lambda: self.set_exact_count(count))
+        return rows
+
+    def load_filtered_page(self, page):
+        post_ids = self.filter_ids[page * PAGE_SIZE:(page + 1) * PAGE_SIZE]
+        if not post_ids:
+            return []
+        placeholders = ",".join("?" * len(post_ids))
+        rows = self.connection().execute(
+            f"SELECT id, user_id, title, body FROM posts WHERE id IN ({placeholders})",
+            post_ids).fetchall()
+        by_id = {row[0]: row for row in rows}
+        missing = [post_id for post_id in post_ids if post_id not in by_id]
+        if missing:
+            # Посты удалены уже после поиска - убираем их строки, но не
+            # посреди отрисовки, а следующим событием цикла
+            QTimer.singleShot(0, lambda: self.drop_filter_ids(missing))
+        return [by_id.get(post_id) for post_id in post_ids]
+
+    def drop_filter_ids(self, post_ids):
+        if self.filter_ids is None:
+            return
+        post_ids = set(post_ids)
+        rows = [row for row, post_id in enumerate(self.filter_ids) if post_id in post_ids]
+        if rows:
+            self.remove_positions(rows)
+
+    def sorted_ids(self, post_ids):
+        if not post_ids:
+            return []
+        placeholders = ",".join("?" * len(post_ids))
+        return [row[0] for row in self.connection().execute(
+            f"SELECT id FROM posts WHERE id IN ({placeholders}) ORDER BY {self.order_by()}",
+            post_ids)]
+
+    def row_at(self, row):
+        if row < 0 or row >= self.row_count:
+            return None
+        page, offset = divmod(row, PAGE_SIZE)
+        rows = self.pages.get(page)
+        if rows is None:
+            try:
+                rows = self.load_page(page)
+            except sqlite3.Error as e:
+                print(f"Ошибка загрузки записей: {e}")
+                return None
+            self.pages[page] = rows
+            while len(self.pages) > MAX_CACHED_PAGES:
+                self.pages.popitem(last=False)
+        else:
+            self.pages.move_to_end(page)
+        return rows[offset] if offset < len(rows) else None
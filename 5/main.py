@@ -1,43 +1,58 @@
 import sys
 import os
+import hashlib
+import json
 import sqlite3
 import requests
+import aiohttp
 import asyncio
 import threading
+from concurrent.futures import ThreadPoolExecutor
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QPushButton, QVBoxLayout, QLabel, QWidget, QProgressBar, QTextEdit
 )
-from PyQt5.QtCore import QTimer, pyqtSignal, QObject
+from PyQt5.QtCore import QTimer, pyqtSignal, QObject, QRunnable, QThreadPool
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DB_PATH = os.path.join(BASE_DIR, 'blog.db')
+POSTS_URL = "https://jsonplaceholder.typicode.com/posts"
+
+# Период фоновой синхронизации и таймаут запроса, с
+SYNC_INTERVAL = 10
+SYNC_TIMEOUT = 30
+
+# Сколько постов записывать за одну транзакцию при загрузке
+SAVE_BATCH_SIZE = 500
+# Доля шкалы прогресса на скачивание, остальное - на запись в базу
+DOWNLOAD_PROGRESS = 50
+
+sys.path.append(os.path.dirname(BASE_DIR))
+
+from common.blog_db import (  # noqa: E402
+    get_database, migrate, save_changed_posts, sync_posts
+)
+from common.http_cache import default_cache  # noqa: E402
 
 # Инициализация базы данных
 
 
 def create_database():
-    """Создание базы данных и таблицы posts"""
+    """Создание базы данных и обновление схемы таблицы posts"""
     conn = None
     try:
         # Проверяем, существует ли база данных
-        if os.path.exists(DB_PATH):
+        exists = os.path.exists(DB_PATH)
+        if exists:
             print("База данных уже существует")
-            return
 
         conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
+        old_version, new_version = migrate(conn)
 
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS posts (
-                id INTEGER PRIMARY KEY,
-                user_id INTEGER,
-                title TEXT,
-                body TEXT
-            )
-        ''')
-
-        conn.commit()
-        print("База данных успешно создана")
+        if not exists:
+            print("База данных успешно создана")
+        elif new_version != old_version:
+            print(f"Схема базы данных обновлена с версии {old_version} "
+                  f"до {new_version}")
 
     except sqlite3.Error as error:
         print("Ошибка при создании базы данных:", error)
@@ -45,12 +60,73 @@ def create_database():
         if conn:
             conn.close()
 
+
+def write_posts(rows):
+    # Неизменённые посты (по хэшу содержимого) не перезаписываются
+    connection = get_database(DB_PATH).connection()
+    with connection:
+        return save_changed_posts(connection, rows)
+
+
+class AsyncRunner:
+    """Один долгоживущий цикл asyncio в отдельном потоке.
+
+    GUI отправляет в него корутины через submit() и получает
+    concurrent.futures.Future; результаты возвращаются сигналами Qt.
+    """
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+
+    def submit(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
 # Класс для управления сигналами
 
 
 class SignalEmitter(QObject):
     data_loaded = pyqtSignal(list)
     progress_updated = pyqtSignal(int)
+    load_finished = pyqtSignal(str)
+    sync_finished = pyqtSignal(str, dict)
+    sync_failed = pyqtSignal(str)
+
+
+class SyncTask(QRunnable):
+    """Фоновая синхронизация постов с сервером.
+
+    Если тело ответа совпадает с уже синхронизированным (по контрольной
+    сумме), база не трогается; иначе записываются только отличия.
+    """
+
+    def __init__(self, http_cache, signals, last_checksum):
+        super().__init__()
+        self.http_cache = http_cache
+        self.signals = signals
+        self.last_checksum = last_checksum
+
+    def run(self):
+        try:
+            response = self.http_cache.get(POSTS_URL, timeout=SYNC_TIMEOUT)
+            response.raise_for_status()
+            checksum = hashlib.sha256(response.content).hexdigest()
+            if checksum == self.last_checksum:
+                self.signals.sync_finished.emit(checksum, {})
+                return
+            # У потока пула своё долгоживущее соединение
+            connection = get_database(DB_PATH).connection()
+            result = sync_posts(connection, response.json())
+        except (requests.RequestException, ValueError, sqlite3.Error) as error:
+            self.signals.sync_failed.emit(str(error))
+            return
+        self.signals.sync_finished.emit(checksum, result)
 
 
 class MainWindow(QMainWindow):
@@ -59,12 +135,15 @@ class MainWindow(QMainWindow):
         self.setWindowTitle("Многозадачность в PyQt5")
 
         self.load_button = QPushButton("Загрузить данные")
+        self.cancel_button = QPushButton("Отменить загрузку")
+        self.cancel_button.setEnabled(False)
         self.progress_bar = QProgressBar()
         self.log = QTextEdit()
         self.log.setReadOnly(True)
 
         layout = QVBoxLayout()
         layout.addWidget(self.load_button)
+        layout.addWidget(self.cancel_button)
         layout.addWidget(QLabel("Прогресс:"))
         layout.addWidget(self.progress_bar)
         layout.addWidget(QLabel("Лог:"))
@@ -75,47 +154,130 @@ class MainWindow(QMainWindow):
         self.setCentralWidget(container)
 
         self.load_button.clicked.connect(self.start_loading)
+        self.cancel_button.clicked.connect(self.cancel_loading)
 
-        # Таймер для периодической проверки
-        self.timer = QTimer()
-        self.timer.timeout.connect(self.check_updates)
-        self.timer.start(10000)  # Проверка каждые 10 секунд
+        # Общий кэш ответов: повторные загрузки /posts отвечают 304
+        self.http_cache = default_cache()
 
         # Инициализация сигнала
         self.signals = SignalEmitter()
         self.signals.data_loaded.connect(self.display_data)
         self.signals.progress_updated.connect(self.update_progress)
+        self.signals.load_finished.connect(self.on_load_finished)
+        self.signals.sync_finished.connect(self.on_sync_finished)
+        self.signals.sync_failed.connect(self.on_sync_failed)
+
+        # Загрузки идут в одном цикле asyncio на всё время работы окна;
+        # запись в sqlite блокирующая и выполняется в отдельном потоке
+        self.runner = AsyncRunner()
+        self.db_executor = ThreadPoolExecutor(max_workers=1)
+        self.session = None
+        self.load_future = None
+
+        # Синхронизация идёт в пуле из одного потока, GUI не ждёт сеть
+        self.sync_pool = QThreadPool()
+        self.sync_pool.setMaxThreadCount(1)
+        # Поток пула держит своё соединение с базой - не даём ему истечь
+        self.sync_pool.setExpiryTimeout(-1)
+        self.sync_running = False
+        # Контрольная сумма последнего синхронизированного ответа
+        self.sync_checksum = None
+
+        # Таймер для периодической проверки
+        self.timer = QTimer()
+        self.timer.timeout.connect(self.check_updates)
+        self.timer.start(SYNC_INTERVAL * 1000)
 
     def start_loading(self):
+        # Повторные нажатия во время загрузки не запускают вторую
+        if self.load_future is not None and not self.load_future.done():
+            self.log.append("Загрузка уже идёт")
+            return
         self.log.append("Начало загрузки данных...")
-        thread = threading.Thread(target=self.load_data)
-        thread.start()
-
-    def load_data(self):
-        try:
-            url = "https://jsonplaceholder.typicode.com/posts"
-            response = requests.get(url)
-            posts = response.json()
-            self.signals.progress_updated.emit(50)
-
-            # Сохранение данных асинхронно
-            asyncio.run(self.save_data(posts))
-        except Exception as e:
-            self.log.append(f"Ошибка загрузки: {e}")
+        self.progress_bar.setValue(0)
+        self.cancel_button.setEnabled(True)
+        self.load_future = self.runner.submit(self.load_data())
+        self.load_future.add_done_callback(self.load_done)
+
+    def cancel_loading(self):
+        if self.load_future is not None:
+            self.load_future.cancel()
+
+    def load_done(self, future):
+        # Вызывается в потоке цикла - в GUI сообщаем только сигналом
+        if future.cancelled():
+            self.signals.load_finished.emit("Загрузка отменена")
+        elif future.exception() is not None:
+            self.signals.load_finished.emit(f"Ошибка загрузки: {future.exception()}")
+        else:
+            written = future.result()
+            self.signals.load_finished.emit(
+                f"Записано: новых {written['new']}, изменённых {written['changed']}, "
+                f"без изменений {written['unchanged']}")
+
+    def on_load_finished(self, message):
+        self.cancel_button.setEnabled(False)
+        if message:
+            self.log.append(message)
+
+    async def load_data(self):
+        body = await self.download(POSTS_URL)
+        loop = asyncio.get_running_loop()
+        posts = await loop.run_in_executor(None, json.loads, body)
+        return await self.save_data(posts)
+
+    async def download(self, url, conditional=True):
+        """GET с условными заголовками из общего кэша и прогрессом по байтам"""
+        if self.session is None:
+            self.session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=SYNC_TIMEOUT))
+        loop = asyncio.get_running_loop()
+        headers = self.http_cache.request_headers(url) if conditional else {}
+
+        async with self.session.get(url, headers=headers) as response:
+            response.raise_for_status()
+            chunks = []
+            received = 0
+            async for chunk in response.content.iter_chunked(64 * 1024):
+                chunks.append(chunk)
+                received += len(chunk)
+                if response.content_length:
+                    # content_length - размер сжатого ответа, а received
+                    # считается по распакованным байтам
+                    self.signals.progress_updated.emit(min(
+                        DOWNLOAD_PROGRESS * received // response.content_length,
+                        DOWNLOAD_PROGRESS))
+            body = await loop.run_in_executor(
+                None, self.http_cache.update,
+                url, response.status, response.headers, b"".join(chunks))
+
+        if body is None:
+            # 304, а запись уже вытеснена из кэша - запрашиваем заново
+            return await self.download(url, conditional=False)
+        self.signals.progress_updated.emit(DOWNLOAD_PROGRESS)
+        return body
 
     async def save_data(self, posts):
-        await asyncio.sleep(2)
-        connection = sqlite3.connect(DB_PATH)
-        cursor = connection.cursor()
-        cursor.executemany("""
-            INSERT OR REPLACE INTO posts (id, user_id, title, body)
-            VALUES (?, ?, ?, ?)
-        """, [(post['id'], post['userId'], post['title'], post['body']) for post in posts])
-        connection.commit()
-        connection.close()
+        loop = asyncio.get_running_loop()
+        rows = [(post['id'], post['userId'], post['title'], post['body']) for post in posts]
+        written = {"new": 0, "changed": 0, "unchanged": 0}
+        for start in range(0, len(rows), SAVE_BATCH_SIZE):
+            # Каждая пачка - своя транзакция; отмена срабатывает между пачками
+            result = await loop.run_in_executor(
+                self.db_executor, write_posts, rows[start:start + SAVE_BATCH_SIZE])
+            for key, value in result.items():
+                written[key] += value
+            saved = min(start + SAVE_BATCH_SIZE, len(rows))
+            self.signals.progress_updated.emit(
+                DOWNLOAD_PROGRESS + (100 - DOWNLOAD_PROGRESS) * saved // len(rows))
 
         self.signals.progress_updated.emit(100)
         self.signals.data_loaded.emit(posts)
+        return written
+
+    async def close_session(self):
+        if self.session is not None:
+            await self.session.close()
 
     def update_progress(self, value):
         self.progress_bar.setValue(value)
@@ -126,34 +288,41 @@ class MainWindow(QMainWindow):
             self.log.append(f"{post['id']}: {post['title']}")
 
     def check_updates(self):
+        # Предыдущая проверка ещё идёт - не ставим в очередь вторую
+        if self.sync_running:
+            return
         self.log.append("Проверка обновлений...")
-
-        try:
-            # Выполняем запрос на сервер
-            url = "https://jsonplaceholder.typicode.com/posts"
-            response = requests.get(url)
-            posts = response.json()
-
-            # Получаем текущие ID постов в базе данных
-            connection = sqlite3.connect(DB_PATH)
-            cursor = connection.cursor()
-            cursor.execute("SELECT id FROM posts")
-            existing_post_ids = {post[0] for post in cursor.fetchall()}
-            connection.close()
-
-            # Проверяем, появились ли новые посты или обновления
-            new_posts = [post for post in posts if post['id']
-                         not in existing_post_ids]
-
-            if new_posts:
-                self.log.append(f"Обнаружено {len(new_posts)} новых постов!")
-                # Сохраняем новые посты в базу
-                asyncio.run(self.save_data(new_posts))
-            else:
-                self.log.append("Нет новых обновлений.")
-
-        except requests.RequestException as error:
-            self.log.append(f"Ошибка при проверке обновлений: {error}")
+        self.sync_running = True
+        self.sync_pool.start(SyncTask(self.http_cache, self.signals, self.sync_checksum))
+
+    def on_sync_finished(self, checksum, result):
+        self.sync_running = False
+        self.sync_checksum = checksum
+        stats = self.http_cache.stats()
+        self.log.append(
+            f"Кэш: попаданий {stats['hits']}, промахов {stats['misses']}, "
+            f"сэкономлено байт {stats['bytes_saved']}")
+
+        if result and result["new"] + result["changed"] + result["deleted"]:
+            self.log.append(
+                f"Синхронизировано: новых {result['new']}, изменённых "
+                f"{result['changed']}, удалённых {result['deleted']}")
+        else:
+            self.log.append("Нет новых обновлений.")
+
+    def on_sync_failed(self, error):
+        self.sync_running = False
+        self.log.append(f"Ошибка при проверке обновлений: {error}")
+
+    def closeEvent(self, event):
+        # Не даём фоновой синхронизации пережить окно
+        self.timer.stop()
+        self.cancel_loading()
+        self.sync_pool.waitForDone()
+        self.runner.submit(self.close_session()).result()
+        self.runner.stop()
+        self.db_executor.shutdown()
+        super().closeEvent(event)
 
 
 if __name__ == "__main__":
@@ -162,4 +331,6 @@ if __name__ == "__main__":
     app = QApplication(sys.argv)
     window = MainWindow()
     window.show()
-    sys.exit(app.exec_())
+    exit_code = app.exec_()
+    get_database(DB_PATH).close()
+    sys.exit(exit_code)
@@ -0,0 +1,332 @@
+import matplotlib.dates as mdates
+import numpy as np
+from matplotlib.collections import PolyCollection
+
+from downsample import (
+    bar_bucket_size, is_sorted, line_bucket_size, minmax_indices, peak_indices,
+    visible_indices,
+)
+
+# Поля вокруг данных при автомасштабе и запас справа под дописываемые точки:
+# пока новые точки попадают в пределы осей, график обновляется блиттингом
+MARGIN = 0.05
+APPEND_HEADROOM = 0.15
+
+
+def bar_vertices(x, heights, width):
+    """Прямоугольники столбцов одним массивом (n, 4, 2) без цикла по столбцам"""
+    left = x - width / 2
+    right = x + width / 2
+    zeros = np.zeros_like(heights)
+    return np.stack([
+        np.column_stack([left, zeros]),
+        np.column_stack([left, heights]),
+        np.column_stack([right, heights]),
+        np.column_stack([right, zeros]),
+    ], axis=1)
+
+
+def finite_range(values):
+    """Минимум и максимум без NaN (строк с неразобранной датой); None, если пусто"""
+    finite = values[np.isfinite(values)]
+    if not len(finite):
+        return None
+    return finite.min(), finite.max()
+
+
+def padded(low, high, before, after):
+    span = high - low or 1.0
+    return low - span * before, high + span * after
+
+
+class BlitManager:
+    """Перерисовка только анимированных артистов поверх сохранённого фона.
+
+    Фон снимается после каждой полной отрисовки холста; при сохранении
+    картинки артисты дорисовываются в её собственный рендерер.
+    """
+
+    def __init__(self, canvas):
+        self.canvas = canvas
+        self.background = None
+        self.artists = []
+        canvas.mpl_connect("draw_event", self.on_draw)
+
+    def add(self, artist):
+        artist.set_animated(True)
+        self.artists.append(artist)
+
+    def on_draw(self, event):
+        if event.renderer is self.canvas.get_renderer():
+            self.background = self.canvas.copy_from_bbox(self.canvas.figure.bbox)
+        self.draw_artists(event.renderer)
+
+    def draw_artists(self, renderer):
+        for artist in self.artists:
+            if artist.get_visible() and artist.axes.get_visible():
+                artist.draw(renderer)
+
+    def blit(self):
+        if self.background is None:
+            self.canvas.draw_idle()
+            return
+        self.canvas.restore_region(self.background)
+        self.draw_artists(self.canvas.get_renderer())
+        self.canvas.blit(self.canvas.figure.bbox)
+
+
+class Chart:
+    """Постоянные оси и артисты одного типа графика"""
+
+    def __init__(self, figure, name):
+        self.ax = figure.add_subplot(111, label=name)
+
+    def set_active(self, active):
+        self.ax.set_visible(active)
+        # Панель навигации не должна масштабировать скрытые оси
+        self.ax.set_navigate(active)
+
+    def update(self, data):
+        """Обновляет артистов; True, если нужна полная перерисовка холста"""
+        raise NotImplementedError
+
+
+class SeriesChart(Chart):
+    """Значения колонки по датам: линия или столбцы.
+
+    Артист создаётся один раз и получает новые данные на месте. Даты
+    переводятся в числа matplotlib только для новых строк, а на экран
+    идёт прореженная под ширину осей часть видимого диапазона. Корзины
+    прореживания фиксированной длины: дописанные в конец строки меняют
+    только последнюю корзину, и стоимость кадра не растёт с объёмом данных.
+    """
+
+    def __init__(self, figure, name, column, title, blitter, on_view_changed):
+        super().__init__(figure, name)
+        self.column = column
+        self.on_view_changed = on_view_changed
+        self.data = None
+        self.size = 0
+        self.x = np.empty(0)
+        self.sorted = True
+        # Прореженный видимый диапазон: срез строк, точек в корзине, номера
+        # оставленных точек из заполненных корзин и начало незаполненной
+        self.view = None
+        self.step = 0
+        self.kept = np.empty(0, dtype=np.intp)
+        self.tail = 0
+        self.x_range = None
+        self.y_range = None
+        self.redrawing = False
+        self.ax.set_title(title)
+        self.ax.xaxis_date()
+        self.ax.tick_params(axis='x', rotation=45)
+        self.artist = self.create_artist()
+        blitter.add(self.artist)
+        # При масштабировании и сдвиге прореживаем заново под видимый диапазон
+        self.ax.callbacks.connect("xlim_changed", self.on_xlim_changed)
+
+    def sync(self, data):
+        """Переводит в числа даты строк, появившихся с прошлого раза"""
+        if data is not self.data or len(data) < self.size:
+            self.data = data
+            self.size = 0
+        start = self.size
+        self.size = len(data)
+        if len(self.x) < self.size:
+            grown = np.empty(max(self.size, int(len(self.x) * 1.5)))
+            grown[:start] = self.x[:start]
+            self.x = grown
+        self.x[start:self.size] = mdates.date2num(data.column("Date")[start:])
+        # Упорядоченность проверяем только на стыке и новых строках
+        if start == 0:
+            self.sorted = True
+        self.sorted = self.sorted and is_sorted(self.x[max(start - 1, 0):self.size])
+        return start
+
+    def update(self, data):
+        start = self.sync(data)
+        x = self.x[:self.size]
+        y = self.data.column(self.column)
+        if not self.size:
+            self.artist.set_visible(False)
+            return False
+        self.artist.set_visible(True)
+
+        rescale = self.rescale(x, y, start)
+        self.redrawing = True
+        try:
+            if rescale:
+                self.ax.set_xlim(*rescale[0])
+                self.ax.set_ylim(*rescale[1])
+            if rescale or not 0 < start < self.size or not self.append_visible(start):
+                self.draw_visible()
+        finally:
+            self.redrawing = False
+        return bool(rescale)
+
+    def rescale(self, x, y, start):
+        """Новые пределы осей, если новые точки за них выходят, иначе None"""
+        if start == 0:
+            self.x_range = self.y_range = None
+        if start == self.size:
+            return None
+        new_x = finite_range(x[start:])
+        new_y = self.value_range(y[start:].astype(float))
+        if new_x is None or new_y is None:
+            return None
+        if self.x_range is None:
+            self.x_range, self.y_range = new_x, new_y
+            return (padded(*self.x_range, MARGIN, MARGIN),
+                    padded(*self.y_range, MARGIN, MARGIN))
+
+        previous_end = self.x_range[1]
+        self.x_range = (min(self.x_range[0], new_x[0]), max(self.x_range[1], new_x[1]))
+        self.y_range = (min(self.y_range[0], new_y[0]), max(self.y_range[1], new_y[1]))
+
+        xmin, xmax = self.ax.get_xlim()
+        ymin, ymax = self.ax.get_ylim()
+        # Следуем за данными, только если пользователь смотрит на их конец
+        if not xmin <= previous_end <= xmax:
+            return None
+        if (xmin <= self.x_range[0] and self.x_range[1] <= xmax
+                and ymin <= self.y_range[0] and self.y_range[1] <= ymax):
+            return None
+        return (padded(*self.x_range, MARGIN, APPEND_HEADROOM),
+                padded(*self.y_range, MARGIN, MARGIN))
+
+    def value_range(self, values):
+        return finite_range(values)
+
+    def buckets(self):
+        return max(int(self.ax.bbox.width), 1)
+
+    def draw_visible(self):
+        """Прореживает видимый диапазон целиком"""
+        self.view = visible_indices(self.x[:self.size], *self.ax.get_xlim(), self.sorted)
+        x = self.x[self.view]
+        y = self.data.column(self.column)[self.view]
+        self.step = self.bucket_size(len(y), self.buckets())
+        keep = self.reduce(y, self.step)
+        self.tail = len(y) // self.step * self.step if self.step else len(y)
+        self.kept = keep[keep < self.tail]
+        self.set_points(x[keep], y[keep])
+
+    def append_visible(self, start):
+        """Дописывает строки с start; False, если нужно прореживать заново.
+
+        Вызывается, только когда пределы осей не изменились, поэтому новые
+        точки либо попадают в видимый конец данных, либо не видны вовсе.
+        """
+        if not self.sorted or not isinstance(self.view, slice):
+            return False
+        if self.view.stop < start:
+            # Пользователь смотрит на начало данных - на экране ничего не меняется
+            return True
+        if self.view.stop != start:
+            return False
+        count = self.size - self.view.start
+        size = self.bucket_size(count, self.buckets())
+        # Корзины оставляем прежними, пока точек на экране не стало вдвое больше
+        if (size == 0) != (self.step == 0) or size >= 2 * self.step > 0:
+            return False
+
+        self.view = slice(self.view.start, self.size)
+        x = self.x[self.view]
+        y = self.data.column(self.column)[self.view]
+        tail = self.tail + self.reduce(y[self.tail:], self.step)
+        self.tail = count // self.step * self.step if self.step else count
+        self.kept = np.concatenate([self.kept, tail[tail < self.tail]])
+        keep = np.concatenate([self.kept, tail[tail >= self.tail]])
+        self.set_points(x[keep], y[keep])
+        return True
+
+    def on_xlim_changed(self, ax):
+        # Перестроение само может сдвинуть пределы оси - не уходим в рекурсию
+        if self.data is None or self.redrawing or not ax.get_visible():
+            return
+        self.redrawing = True
+        try:
+            self.draw_visible()
+        finally:
+            self.redrawing = False
+        self.on_view_changed()
+
+    def create_artist(self):
+        raise NotImplementedError
+
+    def bucket_size(self, count, buckets):
+        raise NotImplementedError
+
+    def reduce(self, y, size):
+        """Номера точек, оставляемых при корзинах по size точек"""
+        raise NotImplementedError
+
+    def set_points(self, x, y):
+        raise NotImplementedError
+
+
+class LineChart(SeriesChart):
+    def create_artist(self):
+        artist, = self.ax.plot([], [], marker='o', color="C0")
+        return artist
+
+    def bucket_size(self, count, buckets):
+        return line_bucket_size(count, buckets)
+
+    def reduce(self, y, size):
+        return minmax_indices(y, size)
+
+    def set_points(self, x, y):
+        # Маркеры точек имеют смысл, только пока точки не прорежены
+        self.artist.set_marker("None" if self.step else 'o')
+        self.artist.set_data(x, y)
+
+
+class BarChart(SeriesChart):
+    def create_artist(self):
+        # Одна коллекция вместо отдельного Rectangle на каждый столбец
+        artist = PolyCollection([], facecolors="C0", edgecolors="none")
+        self.ax.add_collection(artist, autolim=False)
+        return artist
+
+    def value_range(self, values):
+        # Столбцы растут от нуля
+        limits = super().value_range(values)
+        if limits is None:
+            return None
+        return min(limits[0], 0.0), max(limits[1], 0.0)
+
+    def bucket_size(self, count, buckets):
+        return bar_bucket_size(count, buckets)
+
+    def reduce(self, y, size):
+        return peak_indices(y, size)
+
+    def set_points(self, x, y):
+        # Прореженный столбец занимает свою корзину, иначе 0.8 дня
+        width = 0.8
+        limits = finite_range(x) if self.step else None
+        if limits is not None and len(x) > 1:
+            width = (limits[1] - limits[0]) / len(x)
+        self.artist.set_verts(bar_vertices(x, y.astype(float), width))
+
+
+class PieChart(Chart):
+    """Круговая диаграмма; перестраивается, только когда меняются доли"""
+
+    def __init__(self, figure, name):
+        super().__init__(figure, name)
+        self.counts = None
+
+    def update(self, data):
+        counts = data.category_counts("Category")
+        counts = counts[counts > 0]
+        if self.counts is not None and counts.equals(self.counts):
+            return False
+        self.counts = counts
+        self.ax.clear()
+        if not counts.empty:
+            self.ax.pie(counts, labels=counts.index, autopct='%1.1f%%')
+            self.ax.set_title("Распределение по категориям")
+        return True
@@ -0,0 +1,100 @@
+import hashlib
+import os
+import threading
+
+try:
+    import pyarrow.feather as feather
+except ImportError:  # без pyarrow кэш просто выключен
+    feather = None
+
+DEFAULT_MAX_BYTES = 2 * 1024 * 1024 * 1024
+
+
+class CsvCache:
+    """Колоночные копии загруженных CSV в формате Feather (Arrow IPC).
+
+    Ключ - путь, размер и время изменения исходного файла, так что
+    изменённый CSV просто не найдёт свою старую копию. Файлы пишутся без
+    сжатия и читаются через memory map без разбора текста; это экономит
+    время разбора, но не память - to_pandas() всё равно копирует данные.
+    При превышении лимита удаляются давно не открывавшиеся копии. Если
+    каталог кэша создать нельзя, кэш выключен, как и без pyarrow.
+    """
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        try:
+            os.makedirs(directory, exist_ok=True)
+        except OSError as e:
+            print(f"Кэш CSV отключён, не удалось создать {directory}: {e}")
+            self.directory = None
+
+    @property
+    def enabled(self):
+        return feather is not None and self.directory is not None
+
+    def path_for(self, filename):
+        stat = os.stat(filename)
+        key = f"{os.path.realpath(filename)}\0{stat.st_size}\0{stat.st_mtime_ns}"
+        name = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, name + ".feather")
+
+    def get(self, filename):
+        if not self.enabled:
+            return None
+        path = self.path_for(filename)
+        try:
+            table = feather.read_table(path, memory_map=True)
+        except (OSError, ValueError):
+            # Нет копии или она повреждена - читаем CSV заново
+            return None
+        # Время доступа для вытеснения давно не использованных копий
+        os.utime(path)
+        return table.to_pandas()
+
+    def put(self, filename, data, stat):
+        """Сохраняет копию, если CSV не менялся с момента stat"""
+        if not self.enabled:
+            return
+        current = os.stat(filename)
+        if (current.st_size, current.st_mtime_ns) != (stat.st_size, stat.st_mtime_ns):
+            return
+        path = self.path_for(filename)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            feather.write_feather(data, temp_path, compression="uncompressed")
+            os.replace(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        self.evict()
+
+    def evict(self):
+        with self.lock:
+            entries = []
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith(".feather"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+
+
+def default_cache():
+    """Кэш по переменным окружения CSV_CACHE_PATH и CSV_CACHE_MAX_BYTES"""
+    directory = os.environ.get("CSV_CACHE_PATH") or os.path.join(
+        os.path.expanduser("~"), ".cache", "scripting-langs", "csv")
+    try:
+        max_bytes = int(os.environ.get("CSV_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES))
+    except ValueError:
+        max_bytes = DEFAULT_MAX_BYTES
+    return CsvCache(directory, max_bytes)
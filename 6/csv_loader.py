@@ -0,0 +1,138 @@
+import os
+
+import pandas as pd
+from pandas.api.types import union_categoricals
+from PyQt5.QtCore import QObject, QRunnable, pyqtSignal
+
+# Строк в одном куске при чтении CSV
+CHUNK_SIZE = 200_000
+
+# Типы известных колонок задаём заранее, чтобы pandas не выводил их
+# по всему файлу и не держал промежуточные object-столбцы. BooleanFlag -
+# nullable, чтобы пустая ячейка не обрывала загрузку
+COLUMN_DTYPES = {
+    "Category": "category",
+    "BooleanFlag": "boolean",
+}
+
+# Числовые колонки: нечисловые ячейки становятся NaN. Сужение до float32
+# pandas проверяет приближённо: заметно искажённые значения (вроде
+# 1234567.89) оставляют колонку в float64, но знаки после седьмого
+# значащего могут теряться - для графиков этого достаточно
+NUMERIC_COLUMNS = ("Value1", "Value2")
+
+
+def read_options(columns):
+    # Объявляем типы только для колонок, которые есть в файле
+    options = {"dtype": {name: dtype for name, dtype in COLUMN_DTYPES.items()
+                         if name in columns}}
+    if "Date" in columns:
+        # Даты разбираются один раз при чтении, а не при каждой отрисовке
+        options["parse_dates"] = ["Date"]
+        options["date_format"] = "ISO8601"
+    return options
+
+
+def convert_chunk(chunk):
+    for name in NUMERIC_COLUMNS:
+        if name in chunk:
+            chunk[name] = pd.to_numeric(chunk[name], errors="coerce", downcast="float")
+    # Даты не в ISO 8601 read_csv оставляет строками - разбираем их
+    # медленным путём; неразборчивые становятся NaT и не рисуются
+    if "Date" in chunk and not pd.api.types.is_datetime64_any_dtype(chunk["Date"]):
+        chunk["Date"] = pd.to_datetime(chunk["Date"], format="mixed", errors="coerce")
+    return chunk
+
+
+def concat_chunks(chunks):
+    """Склеивает куски, сохраняя Category категориальной.
+
+    У каждого куска свой набор категорий, и обычный concat превратил бы
+    колонку в строки; объединяем категории отдельно.
+    """
+    if len(chunks) == 1:
+        return chunks[0]
+    if "Category" not in chunks[0]:
+        return pd.concat(chunks, ignore_index=True)
+
+    position = chunks[0].columns.get_loc("Category")
+    categories = union_categoricals([chunk["Category"] for chunk in chunks])
+    data = pd.concat([chunk.drop(columns="Category") for chunk in chunks],
+                     ignore_index=True)
+    data.insert(position, "Category", categories)
+    return data
+
+
+class CsvLoadSignals(QObject):
+    progress = pyqtSignal(int, int)
+    partial = pyqtSignal(int, object)
+    finished = pyqtSignal(int, object)
+    failed = pyqtSignal(int, str)
+
+
+class CsvLoadTask(QRunnable):
+    """Чтение CSV кусками в пуле потоков с прогрессом и отменой.
+
+    Если передан cache (CsvCache), повторное открытие того же файла
+    читает готовую колоночную копию вместо разбора текста.
+    """
+
+    def __init__(self, filename, generation, cache=None, chunk_size=CHUNK_SIZE):
+        super().__init__()
+        self.filename = filename
+        self.generation = generation
+        self.cache = cache
+        self.chunk_size = chunk_size
+        self.cancelled = False
+        self.signals = CsvLoadSignals()
+
+    def cancel(self):
+        self.cancelled = True
+
+    def run(self):
+        try:
+            stat = os.stat(self.filename)
+            if self.cache is not None:
+                data = self.cache.get(self.filename)
+                if data is not None:
+                    self.signals.finished.emit(self.generation, data)
+                    return
+            data = self.load()
+        except Exception as e:
+            self.signals.failed.emit(self.generation, str(e))
+            return
+        if data is None:
+            return
+        self.signals.finished.emit(self.generation, data)
+
+        # Копию пишем уже после показа данных, чтобы не задерживать график
+        if self.cache is not None:
+            try:
+                self.cache.put(self.filename, data, stat)
+            except (OSError, ValueError) as e:
+                print(f"Не удалось сохранить кэш для {self.filename}: {e}")
+
+    def load(self):
+        columns = pd.read_csv(self.filename, nrows=0).columns
+        chunks = []
+        # Промежуточные графики показываем после 1, 2, 4, 8... кусков:
+        # склейка на каждом шаге стоила бы O(n^2), а так - O(n) в сумме
+        next_partial = 1
+
+        with open(self.filename, "rb") as file:
+            size = os.fstat(file.fileno()).st_size
+            reader = pd.read_csv(file, chunksize=self.chunk_size,
+                                 **read_options(columns))
+            for chunk in reader:
+                if self.cancelled:
+                    return None
+                chunks.append(convert_chunk(chunk))
+                self.signals.progress.emit(
+                    self.generation, 100 * file.tell() // size if size else 100)
+                if len(chunks) == next_partial:
+                    next_partial *= 2
+                    self.signals.partial.emit(self.generation, concat_chunks(chunks))
+
+        if not chunks:
+            return pd.DataFrame(columns=columns)
+        return concat_chunks(chunks)
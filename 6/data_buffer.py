@@ -0,0 +1,213 @@
+import numpy as np
+import pandas as pd
+
+# Колонки таблицы, созданной вручную, без загруженного CSV
+DEFAULT_DTYPES = {
+    "Date": "datetime64[us]",
+    "Value1": "float32",
+    "Value2": "float32",
+    "Category": "category",
+}
+
+# Запас места при создании и множитель роста массивов
+INITIAL_HEADROOM = 1024
+GROWTH_FACTOR = 1.5
+
+
+def empty_frame(dtypes=DEFAULT_DTYPES):
+    return pd.DataFrame({name: pd.Series(dtype=dtype) for name, dtype in dtypes.items()})
+
+
+def column_dtype(name, values):
+    """Тип новой колонки: известный для стандартных колонок, иначе по значениям.
+
+    Числа хранятся как float64, а прочее - как object, чтобы прежние
+    строки могли получить пустое значение, как при pd.concat.
+    """
+    if name in DEFAULT_DTYPES:
+        return DEFAULT_DTYPES[name]
+    dtype = pd.Series(values).dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        return "category"
+    if dtype.kind in "iuf":
+        return "float64"
+    if dtype.kind == "M":
+        return "datetime64[us]"
+    return "object"
+
+
+class DataBuffer:
+    """Таблица с дозаписью строк за амортизированное O(1).
+
+    Каждая колонка хранится в numpy-массиве с запасом места, который растёт
+    в GROWTH_FACTOR раз только при заполнении, так что строки не копируются
+    на каждой вставке. Категориальные колонки хранятся кодами. DataFrame
+    собирается лениво в frame() и кэшируется до следующей вставки, а для
+    графиков колонки доступны напрямую через column().
+    """
+
+    def __init__(self, data=None):
+        data = empty_frame() if data is None else data
+        self.names = list(data.columns)
+        self.size = len(data)
+        self.arrays = {}
+        # Для категориальных колонок: список категорий и их номера
+        self.categories = {}
+        self.category_codes = {}
+        capacity = self.size + INITIAL_HEADROOM
+
+        for name in self.names:
+            column = data[name]
+            if isinstance(column.dtype, pd.CategoricalDtype):
+                self.categories[name] = list(column.cat.categories)
+                self.category_codes[name] = {
+                    value: code for code, value in enumerate(self.categories[name])}
+                values = column.cat.codes.to_numpy(dtype=np.int32)
+            else:
+                values = column.to_numpy()
+            array = np.empty(capacity, dtype=values.dtype)
+            array[:self.size] = values
+            self.arrays[name] = array
+        # Исходную таблицу не держим: после копирования в массивы
+        # она только удваивала бы занятую память
+        self.frame_cache = None
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def capacity(self):
+        return len(next(iter(self.arrays.values()))) if self.arrays else 0
+
+    def reserve(self, count):
+        needed = self.size + count
+        if needed <= self.capacity:
+            return
+        capacity = max(needed, int(self.capacity * GROWTH_FACTOR))
+        for name, array in self.arrays.items():
+            grown = np.empty(capacity, dtype=array.dtype)
+            grown[:self.size] = array[:self.size]
+            self.arrays[name] = grown
+
+    def append(self, row):
+        """Добавляет одну строку из словаря; пропущенные колонки - пустые"""
+        if not self.arrays.keys() >= row.keys():
+            self.add_columns({name: [value] for name, value in row.items()})
+        self.reserve(1)
+        for name, array in self.arrays.items():
+            if name not in row:
+                array[self.size] = self.missing_value(name, array)
+            elif name in self.categories:
+                array[self.size] = self.encode_value(name, row[name])
+            elif array.dtype.kind == "M":
+                array[self.size] = pd.Timestamp(row[name]).to_datetime64()
+            else:
+                array[self.size] = row[name]
+        self.size += 1
+        self.frame_cache = None
+
+    def extend(self, rows):
+        """Добавляет пачку строк: DataFrame, словарь колонок или список словарей"""
+        if isinstance(rows, list):
+            rows = pd.DataFrame(rows)
+        columns = dict(rows.items()) if isinstance(rows, pd.DataFrame) else rows
+        self.add_columns(columns)
+        counts = {len(values) for values in columns.values()}
+        if len(counts) > 1:
+            raise ValueError("Колонки разной длины")
+        count = counts.pop() if counts else 0
+        if not count:
+            return
+
+        self.reserve(count)
+        end = self.size + count
+        for name, array in self.arrays.items():
+            if name in columns:
+                array[self.size:end] = self.convert(name, array, columns[name])
+            else:
+                array[self.size:end] = self.missing_value(name, array)
+        self.size = end
+        self.frame_cache = None
+
+    def add_columns(self, columns):
+        """Заводит колонки, которых ещё нет; прежние строки в них пустые"""
+        for name, values in columns.items():
+            if name in self.arrays:
+                continue
+            dtype = column_dtype(name, values)
+            if dtype == "category":
+                self.categories[name] = []
+                self.category_codes[name] = {}
+                array = np.full(self.capacity, -1, dtype=np.int32)
+            else:
+                array = np.empty(self.capacity, dtype=dtype)
+                array[:self.size] = self.missing_value(name, array)
+            self.names.append(name)
+            self.arrays[name] = array
+            self.frame_cache = None
+
+    def convert(self, name, array, values):
+        if name in self.categories:
+            return self.encode(name, values)
+        if array.dtype.kind == "M":
+            return pd.to_datetime(values).to_numpy(dtype=array.dtype)
+        return np.asarray(values, dtype=array.dtype)
+
+    def encode(self, name, values):
+        # Новые значения получают следующие номера, затем коды ищутся разом
+        codes = self.category_codes[name]
+        categories = self.categories[name]
+        values = np.asarray(values, dtype=object)
+        for value in pd.unique(values):
+            if not pd.isna(value) and value not in codes:
+                codes[value] = len(categories)
+                categories.append(value)
+        return pd.Index(categories, dtype=object).get_indexer(values)
+
+    def encode_value(self, name, value):
+        if pd.isna(value):
+            return -1
+        codes = self.category_codes[name]
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(self.categories[name])
+            self.categories[name].append(value)
+        return code
+
+    def missing_value(self, name, array):
+        if name in self.categories:
+            return -1
+        kind = array.dtype.kind
+        if kind == "M":
+            return np.datetime64("NaT")
+        if kind == "f":
+            return np.nan
+        if kind == "b":
+            return False
+        if kind in "iu":
+            return 0
+        return None
+
+    def column(self, name):
+        """Данные колонки без копирования (для категориальных - коды)"""
+        return self.arrays[name][:self.size]
+
+    def category_counts(self, name):
+        """Число строк по категориям - подсчёт по кодам, без сборки DataFrame"""
+        if name not in self.categories:
+            return pd.Series(self.column(name)).value_counts()
+        codes = self.column(name)
+        counts = np.bincount(codes[codes >= 0], minlength=len(self.categories[name]))
+        return pd.Series(counts, index=self.categories[name])
+
+    def frame(self):
+        if self.frame_cache is None:
+            columns = {}
+            for name in self.names:
+                if name in self.categories:
+                    columns[name] = pd.Categorical.from_codes(
+                        self.column(name), self.categories[name])
+                else:
+                    columns[name] = self.column(name)
+            self.frame_cache = pd.DataFrame(columns)
+        return self.frame_cache
@@ -0,0 +1,82 @@
+import numpy as np
+
+
+def is_sorted(x):
+    return bool(np.all(x[1:] >= x[:-1]))
+
+
+def visible_indices(x, xmin, xmax, sorted_x=None):
+    """Индексы точек с x в [xmin, xmax] и по одной соседней с каждой стороны,
+    чтобы линия доходила до краёв графика. Для отсортированного x - срез,
+    по которому колонки берутся без копирования. sorted_x - заранее
+    известная упорядоченность x, чтобы не проверять её каждый раз"""
+    n = len(x)
+    if sorted_x is None:
+        sorted_x = is_sorted(x)
+    if sorted_x:
+        # Отсортированный x (обычный случай для дат) - бинарный поиск
+        start = max(np.searchsorted(x, xmin, side="left") - 1, 0)
+        stop = min(np.searchsorted(x, xmax, side="right") + 1, n)
+        return slice(start, stop)
+    return np.flatnonzero((x >= xmin) & (x <= xmax))
+
+
+def bucket_extremes(values, size, reducers):
+    """Для каждой корзины по size точек - индексы экстремумов.
+
+    reducers - функции argmin/argmax по оси 1; корзины собираются
+    reshape без циклов Python, неполная последняя корзина - отдельно.
+    """
+    n = len(values)
+    full = n // size
+    parts = []
+    for start, block in ((0, values[:full * size].reshape(full, size)),
+                         (full * size, values[full * size:].reshape(1, -1))):
+        if block.size == 0:
+            continue
+        offsets = start + np.arange(block.shape[0]) * size
+        for reducer in reducers:
+            parts.append(offsets + reducer(block))
+    return np.concatenate(parts)
+
+
+def line_bucket_size(n, buckets):
+    """Точек в корзине для линии на buckets пикселей; 0 - прореживать не нужно"""
+    return 0 if n <= 2 * buckets else n // buckets
+
+
+def bar_bucket_size(n, buckets):
+    """Точек в корзине для столбцов на buckets пикселей; 0 - прореживать не нужно"""
+    return 0 if n <= buckets else n // buckets
+
+
+def minmax_indices(y, size):
+    """Индексы минимума и максимума в каждой корзине по size точек (для линий).
+
+    Сохраняет все пики и провалы, поэтому при корзине не шире пикселя
+    линия выглядит так же, как по всем точкам. Корзины отсчитываются от
+    начала y, так что дописанные точки меняют только последнюю из них.
+    """
+    n = len(y)
+    if not size:
+        return np.arange(n)
+    nan = np.isnan(y)
+    low = np.where(nan, np.inf, y)
+    high = np.where(nan, -np.inf, y)
+    indices = np.concatenate([
+        bucket_extremes(low, size, [lambda block: block.argmin(axis=1)]),
+        bucket_extremes(high, size, [lambda block: block.argmax(axis=1)]),
+        [0, n - 1],
+    ])
+    return np.unique(indices)
+
+
+def peak_indices(y, size):
+    """Индекс самого высокого по модулю столбца в каждой корзине по size точек
+    (для гистограмм)"""
+    n = len(y)
+    if not size:
+        return np.arange(n)
+    magnitude = np.nan_to_num(np.abs(y), nan=-1.0)
+    return np.unique(bucket_extremes(
+        magnitude, size, [lambda block: block.argmax(axis=1)]))
@@ -3,13 +3,19 @@ import pandas as pd
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QPushButton, QVBoxLayout, QWidget, QLabel,
     QFileDialog, QComboBox, QLineEdit, QHBoxLayout, QMessageBox,
-    QDoubleSpinBox
+    QDoubleSpinBox, QProgressBar
 )
 from PyQt5.QtGui import QRegExpValidator
-from PyQt5.QtCore import QRegExp
+from PyQt5.QtCore import QRegExp, QThreadPool, QTimer
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT
 from matplotlib.figure import Figure
 
+from charts import BarChart, BlitManager, LineChart, PieChart
+from csv_cache import default_cache
+from csv_loader import CsvLoadTask
+from data_buffer import DataBuffer
+
 
 class DataAnalysisApp(QMainWindow):
     def __init__(self):
@@ -17,6 +23,20 @@ class DataAnalysisApp(QMainWindow):
         self.setWindowTitle("Анализ данных")
         self.setGeometry(100, 100, 800, 600)
         self.data = None
+        # CSV читается в фоне; поколение отсекает сигналы отменённых загрузок
+        self.load_pool = QThreadPool()
+        self.load_pool.setMaxThreadCount(1)
+        self.load_task = None
+        self.load_generation = 0
+        # Колоночные копии CSV: повторное открытие без разбора текста
+        self.csv_cache = default_cache()
+        # Перерисовка откладывается до следующего прохода цикла событий,
+        # так что серия вставок подряд даёт одно обновление графика
+        self.plot_timer = QTimer(self)
+        self.plot_timer.setSingleShot(True)
+        self.plot_timer.setInterval(0)
+        self.plot_timer.timeout.connect(self.update_plot)
+        self.layout_pending = True
         self.init_ui()
 
     def init_ui(self):
@@ -28,18 +48,42 @@ class DataAnalysisApp(QMainWindow):
         controls_layout = QHBoxLayout()
         self.load_button = QPushButton("Загрузить CSV")
         self.load_button.clicked.connect(self.load_csv)
+        self.cancel_button = QPushButton("Отменить")
+        self.cancel_button.clicked.connect(self.cancel_loading)
+        self.cancel_button.hide()
+        self.progress_bar = QProgressBar()
+        self.progress_bar.hide()
         self.graph_type = QComboBox()
         self.graph_type.addItems(
             ["Линейный график", "Гистограмма", "Круговая диаграмма"])
         self.graph_type.currentIndexChanged.connect(self.on_graph_type_changed)
 
         controls_layout.addWidget(self.load_button)
+        controls_layout.addWidget(self.cancel_button)
+        controls_layout.addWidget(self.progress_bar)
         controls_layout.addWidget(self.graph_type)
         layout.addLayout(controls_layout)
 
         # График
         self.canvas = FigureCanvas(Figure(figsize=(10, 6)))
+        layout.addWidget(NavigationToolbar2QT(self.canvas, self))
         layout.addWidget(self.canvas)
+        self.canvas.mpl_connect("resize_event", self.on_canvas_resized)
+
+        # Оси и артисты каждого типа графика создаются один раз
+        figure = self.canvas.figure
+        self.blitter = BlitManager(self.canvas)
+        self.charts = {
+            "Линейный график": LineChart(
+                figure, "line", "Value1", "Значения по датам",
+                self.blitter, self.canvas.draw_idle),
+            "Гистограмма": BarChart(
+                figure, "bars", "Value2", "Значения Value2 по датам",
+                self.blitter, self.canvas.draw_idle),
+            "Круговая диаграмма": PieChart(figure, "pie"),
+        }
+        for chart in self.charts.values():
+            chart.set_active(False)
 
         # Панель ввода данных
         self.input_layout = QHBoxLayout()
@@ -99,69 +143,125 @@ class DataAnalysisApp(QMainWindow):
 
     def add_value(self):
         if self.data is None:
-            self.data = pd.DataFrame(
-                columns=["Date", "Value1", "Value2", "Category"])
+            self.data = DataBuffer()
 
         try:
             new_data = {
-                "Date": self.date_input.text() or "2024-01-01",
+                "Date": pd.Timestamp(self.date_input.text() or "2024-01-01"),
                 "Value1": self.value1_input.value(),
                 "Value2": self.value2_input.value(),
                 "Category": self.category_input.text() or "Default"
             }
 
-            self.data = pd.concat(
-                [self.data, pd.DataFrame([new_data])], ignore_index=True)
+            # Строка дописывается в массивы с запасом, без копирования таблицы
+            self.data.append(new_data)
             self.plot_graph()
 
         except Exception as e:
             QMessageBox.warning(self, "Ошибка", str(e))
 
+    def add_values(self, rows):
+        """Добавляет пачку строк (DataFrame, словарь колонок или список словарей)"""
+        if self.data is None:
+            self.data = DataBuffer()
+        self.data.extend(rows)
+        self.plot_graph()
+
     def plot_graph(self):
-        if self.data is None or self.data.empty:
+        self.plot_timer.start()
+
+    def update_plot(self):
+        current = self.charts[self.graph_type.currentText()]
+        has_data = self.data is not None and len(self.data) > 0
+        for chart in self.charts.values():
+            chart.set_active(has_data and chart is current)
+        if not has_data:
+            self.canvas.draw_idle()
             return
 
-        self.canvas.figure.clf()
-        ax = self.canvas.figure.add_subplot(111)
-
         try:
-            graph_type = self.graph_type.currentText()
+            if current.update(self.data) or self.layout_pending:
+                # Изменились пределы осей или раскладка - нужен полный кадр
+                self.layout_pending = False
+                self.canvas.figure.tight_layout()
+                self.canvas.draw_idle()
+            else:
+                # Новые точки в пределах осей - перерисовываем только данные
+                self.blitter.blit()
 
-            if graph_type == "Линейный график":
-                ax.plot(self.data["Date"], self.data["Value1"], marker='o')
-                ax.set_title("Значения по датам")
-                ax.tick_params(axis='x', rotation=45)
+        except Exception as e:
+            QMessageBox.warning(self, "Ошибка отрисовки", str(e))
 
-            elif graph_type == "Гистограмма":
-                dates = pd.to_datetime(self.data["Date"])
-                ax.bar(dates, self.data["Value2"])
-                ax.set_title("Значения Value2 по датам")
-                ax.tick_params(axis='x', rotation=45)
+    def on_canvas_resized(self, event):
+        # Прореживание зависит от ширины осей в пикселях
+        self.layout_pending = True
+        self.plot_graph()
 
-            else:  # Круговая диаграмма
-                counts = self.data["Category"].value_counts()
-                if not counts.empty:
-                    ax.pie(counts, labels=counts.index, autopct='%1.1f%%')
-                    ax.set_title("Распределение по категориям")
+    def load_csv(self):
+        filename, _ = QFileDialog.getOpenFileName(
+            self, "Открыть CSV", "", "CSV files (*.csv)")
+        if filename:
+            self.start_loading(filename)
+
+    def start_loading(self, filename):
+        self.cancel_loading()
+        self.load_generation += 1
+        self.load_task = CsvLoadTask(filename, self.load_generation, self.csv_cache)
+        self.load_task.signals.progress.connect(self.on_load_progress)
+        self.load_task.signals.partial.connect(self.on_load_partial)
+        self.load_task.signals.finished.connect(self.on_load_finished)
+        self.load_task.signals.failed.connect(self.on_load_failed)
+        self.progress_bar.setValue(0)
+        self.progress_bar.show()
+        self.cancel_button.show()
+        self.load_pool.start(self.load_task)
+
+    def cancel_loading(self):
+        if self.load_task is not None:
+            self.load_task.cancel()
+            self.load_task = None
+        self.load_generation += 1
+        self.progress_bar.hide()
+        self.cancel_button.hide()
+
+    def on_load_progress(self, generation, value):
+        if generation == self.load_generation:
+            self.progress_bar.setValue(value)
+
+    def on_load_partial(self, generation, data):
+        # Пока файл дочитывается, показываем уже загруженную часть
+        if generation == self.load_generation:
+            self.data = DataBuffer(data)
+            self.layout_pending = True
+            self.plot_graph()
 
-            self.canvas.figure.tight_layout()
-            self.canvas.draw()
+    def on_load_finished(self, generation, data):
+        if generation != self.load_generation:
+            return
+        self.load_task = None
+        self.progress_bar.hide()
+        self.cancel_button.hide()
+        self.data = DataBuffer(data)
+        self.layout_pending = True
+        self.plot_graph()
 
-        except Exception as e:
-            QMessageBox.warning(self, "Ошибка отрисовки", str(e))
+    def on_load_failed(self, generation, error):
+        if generation != self.load_generation:
+            return
+        self.load_task = None
+        self.progress_bar.hide()
+        self.cancel_button.hide()
+        QMessageBox.critical(self, "Ошибка", error)
 
-    def load_csv(self):
-        try:
-            filename, _ = QFileDialog.getOpenFileName(
-                self, "Открыть CSV", "", "CSV files (*.csv)")
-            if filename:
-                self.data = pd.read_csv(filename)
-                self.plot_graph()
-        except Exception as e:
-            QMessageBox.critical(self, "Ошибка", str(e))
+    def closeEvent(self, event):
+        # Не даём фоновой загрузке пережить окно и его объекты сигналов
+        self.cancel_loading()
+        self.load_pool.waitForDone()
+        super().closeEvent(event)
 
     def on_graph_type_changed(self):
         self.update_visible_fields()
+        self.layout_pending = True
         self.plot_graph()
 
 
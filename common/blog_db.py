@@ -0,0 +1,340 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+from itertools import islice
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Миграции схемы блога по порядку; номер версии хранится в PRAGMA user_version.
+# Уже выпущенные миграции не меняются - только добавляются новые.
+MIGRATIONS: List[List[str]] = [
+    # 1: исходная таблица
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS posts (
+            id INTEGER PRIMARY KEY,
+            user_id INTEGER,
+            title TEXT,
+            body TEXT
+        )
+        ''',
+    ],
+    # 2: индексы под реальные запросы - посты пользователя и поиск по заголовку
+    [
+        # Записи индекса упорядочены по (user_id, rowid): посты пользователя
+        # находятся поиском и сразу отсортированы по id
+        'CREATE INDEX IF NOT EXISTS posts_user_id ON posts (user_id)',
+        # Поиск по началу заголовка без учёта регистра (LIKE 'текст%');
+        # для выборок id по заголовку индекс покрывающий
+        'CREATE INDEX IF NOT EXISTS posts_title_nocase ON posts (title COLLATE NOCASE)',
+        'ANALYZE',
+    ],
+    # 3: полнотекстовый индекс по заголовку и тексту, синхронизируемый триггерами
+    [
+        '''
+        CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5(
+            title, body,
+            content='posts', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='2 3'
+        )
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS posts_fts_insert AFTER INSERT ON posts BEGIN
+            INSERT INTO posts_fts (rowid, title, body)
+            VALUES (new.id, new.title, new.body);
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS posts_fts_delete AFTER DELETE ON posts BEGIN
+            INSERT INTO posts_fts (posts_fts, rowid, title, body)
+            VALUES ('delete', old.id, old.title, old.body);
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS posts_fts_update AFTER UPDATE ON posts BEGIN
+            INSERT INTO posts_fts (posts_fts, rowid, title, body)
+            VALUES ('delete', old.id, old.title, old.body);
+            INSERT INTO posts_fts (rowid, title, body)
+            VALUES (new.id, new.title, new.body);
+        END
+        ''',
+        "INSERT INTO posts_fts (posts_fts) VALUES ('rebuild')",
+    ],
+    # 4: хэш содержимого строки, чтобы синхронизация писала только изменённые посты
+    [
+        'ALTER TABLE posts ADD COLUMN content_hash BLOB',
+        # Полнотекстовый индекс переписываем, только когда меняется текст,
+        # а не при каждом обновлении строки
+        'DROP TRIGGER IF EXISTS posts_fts_update',
+        '''
+        CREATE TRIGGER posts_fts_update AFTER UPDATE OF title, body ON posts BEGIN
+            INSERT INTO posts_fts (posts_fts, rowid, title, body)
+            VALUES ('delete', old.id, old.title, old.body);
+            INSERT INTO posts_fts (rowid, title, body)
+            VALUES (new.id, new.title, new.body);
+        END
+        ''',
+        'UPDATE posts SET content_hash = post_hash(user_id, title, body)',
+        # Правка поста без нового хэша (например, из просмотрщика) сбрасывает
+        # хэш, и следующая синхронизация сравнит строку заново
+        '''
+        CREATE TRIGGER IF NOT EXISTS posts_content_hash_reset
+        AFTER UPDATE OF user_id, title, body ON posts
+        WHEN new.content_hash IS old.content_hash BEGIN
+            UPDATE posts SET content_hash = NULL WHERE id = new.id;
+        END
+        ''',
+    ],
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def schema_version(connection: sqlite3.Connection) -> int:
+    return connection.execute('PRAGMA user_version').fetchone()[0]
+
+
+def post_hash(user_id: Optional[int], title: Optional[str], body: Optional[str]) -> bytes:
+    """Хэш содержимого поста; одинаков для строки из базы и поста из API"""
+    data = json.dumps([user_id, title, body], ensure_ascii=False).encode('utf-8')
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+def migrate(connection: sqlite3.Connection) -> Tuple[int, int]:
+    """Доводит схему до SCHEMA_VERSION на месте, каждая миграция - в своей транзакции"""
+    old_version = schema_version(connection)
+    # Нужна миграции 4 для заполнения content_hash у существующих строк
+    connection.create_function('post_hash', 3, post_hash, deterministic=True)
+    for version in range(old_version, SCHEMA_VERSION):
+        connection.execute('BEGIN')
+        try:
+            for statement in MIGRATIONS[version]:
+                connection.execute(statement)
+            connection.execute(f'PRAGMA user_version = {version + 1}')
+            connection.commit()
+        except sqlite3.Error:
+            connection.rollback()
+            raise
+    return old_version, schema_version(connection)
+
+
+def fts_query(text: str) -> str:
+    """Превращает пользовательский ввод в безопасный запрос FTS5.
+
+    Фразы в кавычках ищутся целиком, остальные слова - по префиксу.
+    """
+    terms = []
+    for phrase, word in re.findall(r'"([^"]*)"|(\S+)', text):
+        if phrase.strip():
+            terms.append('"' + ' '.join(re.findall(r'\w+', phrase)) + '"')
+        for token in re.findall(r'\w+', word):
+            terms.append(f'"{token}"*')
+    return ' '.join(term for term in terms if term != '""')
+
+
+# Релевантность bm25 с весами колонок: совпадение в заголовке весит
+# в 10 раз больше, чем в тексте. Общая для всех поисков, чтобы порядок
+# выдачи совпадал
+RANK = 'bm25(posts_fts, 10.0, 1.0)'
+
+
+def search_posts(connection: sqlite3.Connection, text: str,
+                 limit: int = 20) -> List[Tuple]:
+    """Посты по релевантности bm25 (совпадение в заголовке весит больше)
+
+    Возвращает кортежи (id, user_id, title, snippet, rank).
+    """
+    query = fts_query(text)
+    if not query:
+        return []
+    return connection.execute(f'''
+        SELECT posts.id, posts.user_id, posts.title,
+               snippet(posts_fts, 1, '[', ']', '…', 12),
+               {RANK} AS rank
+        FROM posts_fts
+        JOIN posts ON posts.id = posts_fts.rowid
+        WHERE posts_fts MATCH ?
+        ORDER BY rank
+        LIMIT ?
+    ''', (query, limit)).fetchall()
+
+
+def search_post_ids(connection: sqlite3.Connection, text: str,
+                    limit: int = 1000) -> List[int]:
+    """Только id найденных постов по релевантности - для фильтрации таблиц"""
+    query = fts_query(text)
+    if not query:
+        return []
+    return [row[0] for row in connection.execute(
+        f'SELECT rowid FROM posts_fts WHERE posts_fts MATCH ? ORDER BY {RANK} LIMIT ?',
+        (query, limit)
+    )]
+
+
+# Сколько постов сверять по хэшам за один запрос
+HASH_BATCH_SIZE = 500
+
+
+def save_changed_posts(connection: sqlite3.Connection,
+                       rows: Iterable[Tuple]) -> Dict[str, int]:
+    """Записывает только новые и изменённые посты из (id, user_id, title, body)
+
+    Хэши сверяются пачками по id; строки с совпавшим хэшем не
+    перезаписываются вовсе. Транзакцией управляет вызывающий код.
+    Возвращает число новых, изменённых и неизменённых постов.
+    """
+    result = {'new': 0, 'changed': 0, 'unchanged': 0}
+    rows = iter(rows)
+    while True:
+        batch = {row[0]: row for row in islice(rows, HASH_BATCH_SIZE)}
+        if not batch:
+            return result
+        stored = dict(connection.execute(
+            f'SELECT id, content_hash FROM posts '
+            f'WHERE id IN ({",".join("?" * len(batch))})',
+            list(batch)))
+
+        writes = []
+        for post_id, row in batch.items():
+            content_hash = post_hash(*row[1:4])
+            if post_id not in stored:
+                result['new'] += 1
+            elif stored[post_id] != content_hash:
+                result['changed'] += 1
+            else:
+                result['unchanged'] += 1
+                continue
+            writes.append((*row[:4], content_hash))
+
+        # UPSERT, а не INSERT OR REPLACE: строка обновляется на месте
+        connection.executemany('''
+            INSERT INTO posts (id, user_id, title, body, content_hash)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (id) DO UPDATE SET
+                user_id = excluded.user_id,
+                title = excluded.title,
+                body = excluded.body,
+                content_hash = excluded.content_hash
+        ''', writes)
+
+
+def sync_posts(connection: sqlite3.Connection, posts: Iterable[Dict]) -> Dict[str, int]:
+    """Приводит таблицу posts к присланному списку, записывая только отличия
+
+    Новые и изменённые посты определяются по хэшу содержимого, посты,
+    которых нет в списке, удаляются. Всё - одной транзакцией.
+    """
+    seen = []
+
+    def rows():
+        for post in posts:
+            seen.append((post['id'],))
+            yield post['id'], post['userId'], post['title'], post['body']
+
+    with connection:
+        # Блокировку записи берём сразу: в отложенной транзакции чтение
+        # хэшей открыло бы снимок, и если другое соединение успеет
+        # записать раньше нас, SQLite вернёт SQLITE_BUSY_SNAPSHOT без
+        # ожидания по busy_timeout
+        connection.execute('BEGIN IMMEDIATE')
+        result = save_changed_posts(connection, rows())
+        result['deleted'] = 0
+        if not seen:
+            # Пустой ответ не считаем удалением всех постов
+            return result
+        connection.execute(
+            'CREATE TEMP TABLE IF NOT EXISTS feed_ids (id INTEGER PRIMARY KEY)')
+        connection.execute('DELETE FROM temp.feed_ids')
+        connection.executemany(
+            'INSERT OR IGNORE INTO temp.feed_ids (id) VALUES (?)', seen)
+        result['deleted'] = connection.execute(
+            'DELETE FROM posts WHERE id NOT IN (SELECT id FROM temp.feed_ids)'
+        ).rowcount
+    return result
+
+
+# Настройки соединения: WAL позволяет читателям не ждать писателя,
+# synchronous=NORMAL в режиме WAL безопасен и сильно дешевле FULL
+PRAGMAS: Dict[str, object] = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -64000,  # ~64 МБ страничного кэша
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+    'busy_timeout': 5000,
+    # INSERT OR REPLACE удаляет старую строку; без этого на удаление
+    # не срабатывает триггер и полнотекстовый индекс расходится с posts
+    'recursive_triggers': 'ON',
+}
+
+# Сколько подготовленных выражений sqlite3 держит на соединение
+CACHED_STATEMENTS = 256
+
+
+class BlogDatabase:
+    """Долгоживущие соединения с базой блога, по одному на поток
+
+    Соединения хранятся по идентификатору потока, а не в threading.local:
+    для потоков QThreadPool PyQt не сохраняет состояние Python между
+    задачами, и локальные данные потока терялись бы вместе с соединением.
+    Соединения завершившихся потоков threading закрываются при открытии
+    нового; потоки пулов Qt для Python всегда «живы», поэтому пулы,
+    работающие с базой, не отпускают свои потоки (setExpiryTimeout(-1)),
+    а их соединения закрывает close().
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.lock = threading.Lock()
+        self.connections: Dict[int, sqlite3.Connection] = {}
+        self.migrated = False
+
+    def connection(self) -> sqlite3.Connection:
+        connection = self.connections.get(threading.get_ident())
+        if connection is not None:
+            return connection
+
+        connection = sqlite3.connect(
+            self.path,
+            cached_statements=CACHED_STATEMENTS,
+            # Соединение используется только своим потоком, но закрыть его
+            # может close() из другого потока
+            check_same_thread=False
+        )
+        for name, value in PRAGMAS.items():
+            connection.execute(f'PRAGMA {name} = {value}')
+
+        with self.lock:
+            if not self.migrated:
+                migrate(connection)
+                self.migrated = True
+            # Закрываем соединения уже завершившихся потоков threading
+            alive = {thread.ident for thread in threading.enumerate()}
+            for ident in [i for i in self.connections if i not in alive]:
+                self.connections.pop(ident).close()
+            self.connections[threading.get_ident()] = connection
+
+        return connection
+
+    def close(self) -> None:
+        with self.lock:
+            for connection in self.connections.values():
+                connection.close()
+            self.connections.clear()
+
+
+_databases: Dict[str, BlogDatabase] = {}
+_databases_lock = threading.Lock()
+
+
+def get_database(path: str) -> BlogDatabase:
+    """Общий BlogDatabase на файл, чтобы все модули приложения делили соединения"""
+    path = os.path.abspath(path)
+    with _databases_lock:
+        database = _databases.get(path)
+        if database is None:
+            database = _databases[path] = BlogDatabase(path)
+        return database
@@ -0,0 +1,231 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional
+
+import requests
+
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+
+
+class CacheEntry(NamedTuple):
+    etag: Optional[str]
+    last_modified: Optional[str]
+    body: bytes
+
+
+class MemoryStore:
+    """LRU-хранилище ответов в памяти, ограниченное суммарным размером"""
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self.entries: 'OrderedDict[str, CacheEntry]' = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+            return entry
+
+    def put(self, key: str, entry: CacheEntry) -> None:
+        if len(entry.body) > self.max_bytes:
+            return
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old.body)
+            self.entries[key] = entry
+            self.size += len(entry.body)
+            while self.size > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted.body)
+
+    def close(self) -> None:
+        pass
+
+
+class DiskStore:
+    """LRU-хранилище ответов в файле SQLite"""
+
+    def __init__(self, path: str, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute('''
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                body BLOB,
+                size INTEGER,
+                accessed INTEGER
+            )
+        ''')
+        self.connection.execute(
+            'CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)')
+        self.connection.commit()
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT etag, last_modified, body FROM entries WHERE key = ?',
+                (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self.connection.execute(
+                'UPDATE entries SET accessed = ? WHERE key = ?',
+                (time.time_ns(), key)
+            )
+            self.connection.commit()
+            return CacheEntry(row[0], row[1], bytes(row[2]))
+
+    def put(self, key: str, entry: CacheEntry) -> None:
+        if len(entry.body) > self.max_bytes:
+            return
+        with self.lock:
+            self.connection.execute(
+                'INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)',
+                (key, entry.etag, entry.last_modified, entry.body,
+                 len(entry.body), time.time_ns())
+            )
+            size = self.connection.execute(
+                'SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+            if size > self.max_bytes:
+                # Удаляем давно не использованные записи, пока не влезем в лимит
+                for old_key, old_size in self.connection.execute(
+                        'SELECT key, size FROM entries ORDER BY accessed').fetchall():
+                    if size <= self.max_bytes:
+                        break
+                    self.connection.execute(
+                        'DELETE FROM entries WHERE key = ?', (old_key,))
+                    size -= old_size
+            self.connection.commit()
+
+    def close(self) -> None:
+        with self.lock:
+            self.connection.close()
+
+
+class HttpCache:
+    """Кэш ответов на основе условных запросов (ETag / Last-Modified)"""
+
+    def __init__(self, store=None) -> None:
+        self.store = store if store is not None else MemoryStore()
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self.lock = threading.Lock()
+
+    def request_headers(self, key: str) -> Dict[str, str]:
+        entry = self.store.get(key)
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers['If-None-Match'] = entry.etag
+            if entry.last_modified:
+                headers['If-Modified-Since'] = entry.last_modified
+        return headers
+
+    def update(self, key: str, status: int, headers, body: bytes) -> Optional[bytes]:
+        """Обрабатывает ответ сервера и возвращает актуальное тело.
+
+        None означает, что сервер ответил 304, а запись уже вытеснена из
+        кэша - запрос нужно повторить без условных заголовков.
+        """
+        if status == 304:
+            entry = self.store.get(key)
+            if entry is None:
+                return None
+            with self.lock:
+                self.hits += 1
+                self.bytes_saved += len(entry.body)
+            return entry.body
+
+        with self.lock:
+            self.misses += 1
+        etag = headers.get('ETag')
+        last_modified = headers.get('Last-Modified')
+        if status == 200 and (etag or last_modified):
+            self.store.put(key, CacheEntry(etag, last_modified, body))
+        return body
+
+    def get(self, url: str, session=None, **kwargs) -> requests.Response:
+        """GET через кэш; 304 превращается в обычный 200 с сохранённым телом.
+
+        При stream=True ответ, который всё равно не поместится в хранилище
+        (без Content-Length или больше лимита), отдаётся потоком без чтения
+        тела в память.
+        """
+        session = session if session is not None else requests
+        stream = kwargs.pop('stream', False)
+        key = requests.Request('GET', url, params=kwargs.pop('params', None)).prepare().url
+        headers = dict(kwargs.pop('headers', None) or {})
+
+        response = session.get(
+            key, headers={**headers, **self.request_headers(key)},
+            stream=stream, **kwargs)
+        if stream and response.status_code != 304 and not self.cacheable(response):
+            with self.lock:
+                self.misses += 1
+            return response
+
+        body = self.update(
+            key, response.status_code, response.headers,
+            b'' if response.status_code == 304 else response.content
+        )
+        if body is None:
+            response = session.get(key, headers=headers, stream=stream, **kwargs)
+            if stream and not self.cacheable(response):
+                with self.lock:
+                    self.misses += 1
+                return response
+            body = self.update(
+                key, response.status_code, response.headers, response.content)
+        elif response.status_code == 304:
+            response.status_code = 200
+            response.reason = 'OK (cached)'
+            response._content = body
+            response._content_consumed = True
+        return response
+
+    def cacheable(self, response: requests.Response) -> bool:
+        length = response.headers.get('Content-Length')
+        return (
+            response.status_code == 200
+            and bool(response.headers.get('ETag') or response.headers.get('Last-Modified'))
+            and length is not None and length.isdigit()
+            and int(length) <= self.store.max_bytes
+        )
+
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'bytes_saved': self.bytes_saved
+            }
+
+    def close(self) -> None:
+        self.store.close()
+
+
+def default_cache() -> HttpCache:
+    """Кэш по настройкам пользователя из переменных окружения.
+
+    HTTP_CACHE=memory|disk (по умолчанию disk), HTTP_CACHE_PATH - файл
+    дискового кэша, HTTP_CACHE_MAX_BYTES - лимит размера.
+    """
+    max_bytes = int(os.environ.get('HTTP_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES))
+    if os.environ.get('HTTP_CACHE', 'disk') == 'memory':
+        return HttpCache(MemoryStore(max_bytes))
+
+    path = os.environ.get('HTTP_CACHE_PATH') or os.path.join(
+        os.path.expanduser('~'), '.cache', 'scripting-langs', 'http_cache.db')
+    return HttpCache(DiskStore(path, max_bytes))
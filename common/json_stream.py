@@ -0,0 +1,79 @@
+import codecs
+import json
+from typing import Any, Iterable, Iterator
+
+# Что разбор ждёт дальше
+_START = 'start'          # открывающую скобку
+_FIRST = 'first'          # первый элемент или ] пустого массива
+_VALUE = 'value'          # элемент после запятой
+_SEPARATOR = 'separator'  # запятую или ] после элемента
+
+# Символы, которыми может продолжиться число в следующем куске
+_NUMBER_CHARS = frozenset('0123456789.eE+-')
+
+
+def iter_json_array(chunks: Iterable[bytes]) -> Iterator[Any]:
+    """Инкрементально разбирает JSON-массив из потока байтов
+
+    Бросает ValueError на пропущенной, лишней или висячей запятой и если
+    поток кончился до закрывающей скобки (обрезанный ответ или мусор
+    между элементами).
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder('utf-8')()
+    buffer = ''
+    state = _START
+    chunks = iter(chunks)
+
+    while True:
+        chunk = next(chunks, None)
+        final = chunk is None
+        buffer += text_decoder.decode(b'' if final else chunk, final=final)
+        pos = 0
+        while True:
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n':
+                pos += 1
+            if pos == len(buffer):
+                break
+            char = buffer[pos]
+
+            if state == _START:
+                if char != '[':
+                    raise ValueError('Ожидался JSON-массив')
+                state = _FIRST
+                pos += 1
+            elif state == _SEPARATOR:
+                if char == ']':
+                    return
+                if char != ',':
+                    raise ValueError(
+                        f'Ожидалась запятая в JSON-массиве: {buffer[pos:pos + 50]!r}')
+                state = _VALUE
+                pos += 1
+            elif char == ']' and state == _FIRST:
+                return
+            elif char in ',]':
+                raise ValueError('Лишняя запятая в JSON-массиве')
+            else:
+                try:
+                    item, end = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError as error:
+                    if final:
+                        raise ValueError(
+                            f'Некорректный элемент JSON-массива: {buffer[pos:pos + 50]!r}'
+                        ) from error
+                    # Неполный элемент - ждём следующий кусок
+                    break
+                # Число в конце буфера ("12" из "123" или "1.5" из "1.5e3")
+                # может продолжиться в следующем куске
+                if not final and _NUMBER_CHARS.issuperset(buffer[end:]):
+                    break
+                yield item
+                pos = end
+                state = _SEPARATOR
+        buffer = buffer[pos:]
+
+        if final:
+            if state == _START:
+                raise ValueError('Ожидался JSON-массив')
+            raise ValueError('JSON-массив оборван до закрывающей скобки')